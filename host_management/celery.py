@@ -1,6 +1,8 @@
 import os
+import time
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import before_task_publish
 
 # 设置Django默认配置模块
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'host_management.settings')
@@ -17,19 +19,31 @@ app.autodiscover_tasks()
 app.conf.beat_schedule = {
     'change-passwords-every-8-hours': {
         'task': 'hosts.tasks.change_host_passwords',
-        'schedule': crontab(hour='*/8'),  # 每8小时执行一次
+        'schedule': crontab(minute=0, hour='*/8'),  # 每8小时执行一次（0:00、8:00、16:00）
     },
     'generate-daily-statistics': {
         'task': 'hosts.tasks.generate_daily_statistics',
         'schedule': crontab(hour=0, minute=0),  # 每天00:00执行
     },
-    'ping-hosts-every-hour': {
-        'task': 'hosts.tasks.ping_all_hosts',
-        'schedule': crontab(minute=0),  # 每小时执行一次
+    # 每分钟探测到期的主机，取代每小时全量ping（ping_all_hosts 仍可手动执行）
+    'probe-due-hosts-every-minute': {
+        'task': 'hosts.tasks.probe_due_hosts',
+        'schedule': crontab(),  # 每分钟执行一次
+    },
+    'expire-maintenance-windows-every-minute': {
+        'task': 'hosts.tasks.expire_maintenance_windows',
+        'schedule': crontab(),  # 每分钟执行一次
     },
 }
 
 
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    """在消息头中记录投递时间，用于计算任务排队延迟（见 hosts.task_runs）"""
+    if headers is not None:
+        headers.setdefault('published_at', time.time())
+
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}') 
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+数据库路由
+
+将高写入量的日志/指标表（RequestLog 等）路由到独立的 metrics 库，
+并为只读视图提供只读副本（replica）别名。未配置对应数据库时全部回落到 default。
+"""
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+def _configured(alias):
+    return bool(alias) and alias in settings.DATABASES
+
+
+def metrics_alias():
+    """返回指标库别名，未配置时返回 default"""
+    alias = getattr(settings, 'METRICS_DATABASE_ALIAS', None)
+    return alias if _configured(alias) else DEFAULT_DB_ALIAS
+
+
+def replica_alias():
+    """返回只读副本别名，未配置时返回 None"""
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', None)
+    return alias if _configured(alias) else None
+
+
+def is_metrics_model(model):
+    return model._meta.label_lower in getattr(settings, 'METRICS_MODELS', ())
+
+
+def read_alias_for(model):
+    """只读视图使用的数据库：指标表读指标库，其余表优先读副本"""
+    if is_metrics_model(model):
+        return metrics_alias()
+    return replica_alias() or DEFAULT_DB_ALIAS
+
+
+class DatabaseRouter:
+    """按模型拆分库的路由器"""
+
+    def db_for_read(self, model, **hints):
+        if is_metrics_model(model):
+            return metrics_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        if is_metrics_model(model):
+            return metrics_alias()
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        db1 = metrics_alias() if is_metrics_model(type(obj1)) else DEFAULT_DB_ALIAS
+        db2 = metrics_alias() if is_metrics_model(type(obj2)) else DEFAULT_DB_ALIAS
+        return db1 == db2
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # 副本由主库复制而来，不执行迁移
+        if db == replica_alias():
+            return False
+
+        metrics_db = metrics_alias()
+        if metrics_db == DEFAULT_DB_ALIAS:
+            return None
+
+        if model_name is None:
+            return None
+        is_metrics = f'{app_label}.{model_name}' in getattr(settings, 'METRICS_MODELS', ())
+        if db == metrics_db:
+            return is_metrics
+        if is_metrics:
+            return False
+        return None
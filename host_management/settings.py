@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'hosts.middleware.CompressionMiddleware',  # 响应压缩（gzip/brotli）
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -80,13 +81,47 @@ WSGI_APPLICATION = 'host_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+def _database_from_env(prefix, default_name=None):
+    """根据环境变量 <PREFIX>_DB_* 构造数据库配置，未设置 NAME 时返回 None"""
+    name = os.environ.get(f'{prefix}_DB_NAME', default_name)
+    if not name:
+        return None
+    return {
+        'ENGINE': os.environ.get(f'{prefix}_DB_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': name,
+        'USER': os.environ.get(f'{prefix}_DB_USER', ''),
+        'PASSWORD': os.environ.get(f'{prefix}_DB_PASSWORD', ''),
+        'HOST': os.environ.get(f'{prefix}_DB_HOST', ''),
+        'PORT': os.environ.get(f'{prefix}_DB_PORT', ''),
     }
+
+
+DATABASES = {
+    'default': _database_from_env('DEFAULT', BASE_DIR / 'db.sqlite3'),
 }
 
+# 可选：请求日志/指标独立库（METRICS_DB_NAME 等环境变量）
+METRICS_DATABASE_ALIAS = 'metrics'
+if _database_from_env('METRICS'):
+    DATABASES[METRICS_DATABASE_ALIAS] = _database_from_env('METRICS')
+
+# 可选：只读副本（REPLICA_DB_NAME 等环境变量），测试时镜像 default
+REPLICA_DATABASE_ALIAS = 'replica'
+if _database_from_env('REPLICA'):
+    DATABASES[REPLICA_DATABASE_ALIAS] = _database_from_env('REPLICA')
+    DATABASES[REPLICA_DATABASE_ALIAS]['TEST'] = {'MIRROR': 'default'}
+
+# 路由到指标库的模型（app_label.model_name）
+METRICS_MODELS = [
+    'hosts.requestlog',
+    'hosts.pingsweep',
+    'hosts.pingsweepshard',
+    'hosts.taskrun',
+    'hosts.credentialaccesslog',
+]
+
+DATABASE_ROUTERS = ['host_management.routers.DatabaseRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -135,13 +170,25 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework 配置
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'hosts.pagination.StandardPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'hosts.renderers.FastJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'hosts.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
+# 管理后台大表分页（hosts.pagination.EstimatedCountPaginator）最多精确计数的行数
+ADMIN_COUNT_CAP = 10000
+
+# 响应压缩：不小于该字节数的响应才压缩；安装 brotli 后优先使用 br
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI_QUALITY = 4
+
 # Celery 配置
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -150,6 +197,52 @@ CELERY_TIMEZONE = TIME_ZONE
 # 加密配置
 ENCRYPTION_KEY = ENCRYPTION_KEY
 
+# 单个请求允许的SQL条数，超出时在请求日志中标记并记录警告
+REQUEST_QUERY_BUDGET = 50
+
+# 主机探测函数，签名同 hosts.ping.ping_host
+HOST_PROBER = 'hosts.ping.ping_host'
+
+# 分片ping巡检配置
+PING_SWEEP_STRATEGY = 'datacenter'  # datacenter: 按机房分片; hash: 按ID哈希分片
+PING_SWEEP_HASH_SHARDS = 8          # 按ID哈希分片时的最少分片数
+PING_SWEEP_SHARD_SIZE = 5000        # 按ID哈希分片时每个分片的目标主机数（主机多时增加分片数）
+# 机房代码 -> Celery队列，使探测在就近的worker上执行，未配置的机房使用默认队列
+PING_SWEEP_QUEUES = {}
+
+# 自适应探测调度（hosts.scheduling），单位秒
+PROBE_MIN_INTERVAL = 60             # 最短探测间隔，也是失败和抖动主机的复查间隔
+PROBE_MAX_INTERVAL = 7200           # 稳定主机退避的上限
+PROBE_FAILED_MAX_INTERVAL = 900     # 持续失败主机退避的上限
+PROBE_FLAP_THRESHOLD = 3.0          # 抖动分数达到该值视为抖动
+PROBE_FLAP_DECAY = 0.8              # 每次探测抖动分数的衰减系数
+PROBE_JITTER = 0.1                  # 探测间隔的随机抖动比例
+PROBE_BATCH_SIZE = 20000            # 每次调度最多认领的到期主机数
+PROBE_SHARD_SIZE = 500              # 每个 probe_hosts 子任务探测的主机数
+PROBE_CONCURRENCY = 50              # 每个子任务的并发探测线程数
+PROBE_CLAIM_TIMEOUT = 300           # 认领后未写回结果（子任务崩溃）的主机在该时间后重新到期
+
+# 主机批量操作（hosts.bulk）
+BULK_SYNC_LIMIT = 5000              # 修改状态/维护窗口在请求内直接执行的最大主机数
+BULK_ROTATE_SYNC_LIMIT = 200        # 轮换密码在请求内直接执行的最大主机数
+BULK_CHUNK_SIZE = 1000              # 后台执行时每个事务处理的主机数
+
+# root密码批量读取（hosts.credentials）
+CREDENTIAL_CHUNK_SIZE = 1000        # 每次读取、解密并写入审计记录的主机数
+CREDENTIAL_DECRYPT_WORKERS = 0      # 接口解密使用的进程数，0或1表示在请求进程内解密
+
+# 全量任务分块处理（hosts.chunking）每块的行数
+TASK_CHUNK_SIZE = 1000
+
+# 定时任务互斥锁：redis（默认，使用 TASK_LOCK_REDIS_URL 或 CELERY_BROKER_URL）或 db（本地测试）
+TASK_LOCK_BACKEND = os.environ.get('TASK_LOCK_BACKEND', 'redis')
+TASK_LOCK_REDIS_URL = None
+
+# 任务性能剖析：列出的任务每次执行都会保存剖析文件到 TASK_PROFILE_DIR
+TASK_PROFILE_TASKS = []
+TASK_PROFILER = 'cprofile'  # cprofile 或 pyinstrument（需单独安装）
+TASK_PROFILE_DIR = BASE_DIR / 'profiles'
+
 # Celery 配置
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
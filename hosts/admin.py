@@ -1,5 +1,68 @@
+from datetime import timedelta
 from django.contrib import admin
-from .models import City, DataCenter, Host, HostStatistics, RequestLog
+from django.utils import timezone
+from .crypto import generate_password
+from .pagination import EstimatedCountPaginator
+from .models import (
+    BulkJob, City, CredentialAccessLog, DataCenter, Host, HostStatistics, RequestLog, PingSweep, PingSweepShard, TaskRun
+)
+
+
+class DataCenterListFilter(admin.RelatedFieldListFilter):
+    """机房过滤器，选项一次查询取出（DataCenter.__str__ 需要城市名）"""
+
+    def field_choices(self, field, request, model_admin):
+        return [(datacenter.pk, str(datacenter))
+                for datacenter in DataCenter.objects.select_related('city').order_by('city__name', 'name')]
+
+
+class RequestMethodListFilter(admin.SimpleListFilter):
+    """请求方法过滤器，选项固定，不对日志表做 SELECT DISTINCT"""
+    title = '请求方法'
+    parameter_name = 'method'
+    METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS']
+
+    def lookups(self, request, model_admin):
+        return [(method, method) for method in self.METHODS]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(method=self.value())
+        return queryset
+
+
+class StatusClassListFilter(admin.SimpleListFilter):
+    """状态码类别过滤器，转换为 status_code 上的范围查询（requestlog_status_created_idx）"""
+    title = '状态码'
+    parameter_name = 'status_class'
+
+    def lookups(self, request, model_admin):
+        return [(str(n), f'{n}xx') for n in (2, 3, 4, 5)]
+
+    def queryset(self, request, queryset):
+        if self.value() in ('2', '3', '4', '5'):
+            low = int(self.value()) * 100
+            return queryset.filter(status_code__gte=low, status_code__lt=low + 100)
+        return queryset
+
+
+class RecentTimeListFilter(admin.SimpleListFilter):
+    """最近时间段过滤器，转换为 created_at 上的范围查询（requestlog_created_idx）
+
+    代替 date_hierarchy：其按年/月/日钻取的选项需要对整表（或整年）做 SELECT DISTINCT。
+    """
+    title = '请求时间'
+    parameter_name = 'recent'
+    RANGES = {'1h': ('最近1小时', timedelta(hours=1)), '24h': ('最近24小时', timedelta(days=1)),
+              '7d': ('最近7天', timedelta(days=7)), '30d': ('最近30天', timedelta(days=30))}
+
+    def lookups(self, request, model_admin):
+        return [(key, title) for key, (title, _) in self.RANGES.items()]
+
+    def queryset(self, request, queryset):
+        if self.value() in self.RANGES:
+            return queryset.filter(created_at__gte=timezone.now() - self.RANGES[self.value()][1])
+        return queryset
 
 
 @admin.register(City)
@@ -12,6 +75,7 @@ class CityAdmin(admin.ModelAdmin):
 @admin.register(DataCenter)
 class DataCenterAdmin(admin.ModelAdmin):
     list_display = ['name', 'code', 'city', 'address', 'created_at']
+    list_select_related = ['city']
     list_filter = ['city']
     search_fields = ['name', 'code', 'address']
     ordering = ['city', 'name']
@@ -19,39 +83,41 @@ class DataCenterAdmin(admin.ModelAdmin):
 
 @admin.register(Host)
 class HostAdmin(admin.ModelAdmin):
-    list_display = ['name', 'ip_address', 'datacenter', 'status', 'last_password_change']
-    list_filter = ['status', 'datacenter__city', 'datacenter']
+    list_display = ['name', 'ip_address', 'datacenter', 'status', 'maintenance_until', 'last_password_change']
+    list_select_related = ['datacenter__city']
+    list_filter = ['status', 'datacenter__city', ('datacenter', DataCenterListFilter)]
     search_fields = ['name', 'ip_address']
-    ordering = ['datacenter', 'name']
+    # 按 datacenter_id 而不是 datacenter 排序，避免按关联模型的默认排序连表，可以使用 host_dc_name_idx
+    ordering = ['datacenter_id', 'name']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     readonly_fields = ['encrypted_root_password', 'last_password_change', 'created_at', 'updated_at']
     
     def save_model(self, request, obj, form, change):
         # 如果是新建主机且没有设置密码，生成随机密码
         if not change and not obj.encrypted_root_password:
-            import random
-            import string
-            password = ''.join(random.choices(
-                string.ascii_letters + string.digits + '!@#$%^&*',
-                k=12
-            ))
-            obj.set_root_password(password)
+            obj.set_root_password(generate_password())
         super().save_model(request, obj, form, change)
 
 
 @admin.register(HostStatistics)
 class HostStatisticsAdmin(admin.ModelAdmin):
     list_display = ['city', 'datacenter', 'total_hosts', 'active_hosts', 'inactive_hosts', 'maintenance_hosts', 'date']
-    list_filter = ['city', 'datacenter', 'date']
+    list_select_related = ['city', 'datacenter__city']
+    list_filter = ['city', ('datacenter', DataCenterListFilter), 'date']
     ordering = ['-date', 'city', 'datacenter']
     readonly_fields = ['created_at']
 
 
 @admin.register(RequestLog)
 class RequestLogAdmin(admin.ModelAdmin):
-    list_display = ['method', 'path', 'response_time', 'status_code', 'ip_address', 'created_at']
-    list_filter = ['method', 'status_code', 'created_at']
+    list_display = ['method', 'path', 'response_time', 'query_count', 'sql_time', 'status_code', 'ip_address', 'created_at']
+    # 过滤器选项都是固定的，打开列表页不会对日志表做 SELECT DISTINCT
+    list_filter = [RecentTimeListFilter, StatusClassListFilter, RequestMethodListFilter, 'over_query_budget']
     search_fields = ['path', 'ip_address']
     ordering = ['-created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     readonly_fields = ['created_at']
     
     def has_add_permission(self, request):
@@ -59,3 +125,63 @@ class RequestLogAdmin(admin.ModelAdmin):
     
     def has_change_permission(self, request, obj=None):
         return False
+
+
+class PingSweepShardInline(admin.TabularInline):
+    model = PingSweepShard
+    extra = 0
+    can_delete = False
+    readonly_fields = ['shard_key', 'queue', 'status', 'attempts', 'host_count', 'reachable_count',
+                       'unreachable_count', 'changed_count', 'error_message', 'started_at', 'finished_at']
+
+
+@admin.register(PingSweep)
+class PingSweepAdmin(admin.ModelAdmin):
+    list_display = ['id', 'strategy', 'cidr', 'status', 'shard_count', 'completed_shards', 'failed_shards',
+                    'total_hosts', 'unreachable_hosts', 'created_at', 'finished_at']
+    list_filter = ['strategy', 'status']
+    ordering = ['-created_at']
+    inlines = [PingSweepShardInline]
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(TaskRun)
+class TaskRunAdmin(admin.ModelAdmin):
+    list_display = ['task_name', 'status', 'started_at', 'duration', 'lag', 'item_count']
+    list_filter = ['task_name', 'status']
+    ordering = ['-started_at']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BulkJob)
+class BulkJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'action', 'status', 'total', 'processed', 'created_at', 'finished_at']
+    list_filter = ['action', 'status']
+    ordering = ['-created_at']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CredentialAccessLog)
+class CredentialAccessLogAdmin(admin.ModelAdmin):
+    list_display = ['user', 'source', 'ip_address', 'host_id', 'remote_addr', 'decrypt_failed', 'accessed_at']
+    list_filter = ['source', 'decrypt_failed']
+    search_fields = ['user', 'ip_address']
+    ordering = ['-accessed_at']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
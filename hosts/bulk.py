@@ -0,0 +1,147 @@
+"""
+主机批量操作
+
+目标主机由条件确定（ids / datacenter_id / city_id / cidr，多个条件取交集）。
+修改状态和维护窗口是集合操作，目标主机数不超过 BULK_SYNC_LIMIT 时在请求内用一条 UPDATE 完成；
+轮换密码需要逐台生成并加密，超过 BULK_ROTATE_SYNC_LIMIT 台即转为后台执行。
+后台任务（hosts.tasks.run_bulk_job）按主键顺序分块处理，每块一个事务并记录进度，中断后可从断点继续。
+"""
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .chunking import iter_chunks
+from .crypto import encrypt_password, generate_password, get_fernet
+from .models import BulkJob, Host
+
+
+def target_hosts(target):
+    """按目标条件返回主机集合（条件已由 BulkTargetSerializer 校验）
+
+    按键是否存在而非取值真假判断条件，值为 0 或空的条件不会被忽略而扩大到全部主机。
+    """
+    queryset = Host.objects.all()
+    if target.get('ids') is not None:
+        queryset = queryset.filter(pk__in=target['ids'])
+    if target.get('datacenter_id') is not None:
+        queryset = queryset.filter(datacenter_id=target['datacenter_id'])
+    if target.get('city_id') is not None:
+        queryset = queryset.filter(datacenter__city_id=target['city_id'])
+    if target.get('cidr') is not None:
+        queryset = queryset.in_cidr(target['cidr'])
+    return queryset
+
+
+def _update_values(action, params, now):
+    """修改状态/维护窗口对应的 UPDATE 字段"""
+    if action == 'maintenance':
+        return {'status': 'maintenance', 'maintenance_until': parse_datetime(params['until']), 'updated_at': now}
+    values = {'status': params['status'], 'maintenance_until': None, 'updated_at': now}
+    if params['status'] != 'maintenance':
+        # 尽快重新探测，确认人工设置的状态
+        values['next_probe_at'] = now
+    return values
+
+
+def update_rows(model, objs, fields, guard=None):
+    """用一条参数化 UPDATE 按主键逐行写回 objs 的字段值（executemany），返回写入的行数
+
+    每行的值各不相同时比 bulk_update 生成的 CASE WHEN 表达式快一个数量级。
+    guard 为 (guarded_fields, field, expected)：guarded_fields 只在数据库中 field 的值仍为
+    expected(obj) 时才覆盖（如只在状态未被他人修改时写入新状态），其余字段总是写入。
+    """
+    if not objs:
+        return 0
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    opts = model._meta
+    guarded_fields, guard_field, expected = guard or ((), None, None)
+
+    # guard 字段最后赋值：MySQL 按赋值顺序求值，排在它之后的 CASE 会读到已修改的值
+    guarded_fields = sorted(guarded_fields, key=lambda name: name == guard_field)
+
+    assignments = [f'{quote(opts.get_field(name).column)} = %s' for name in fields]
+    if guarded_fields:
+        guard_column = quote(opts.get_field(guard_field).column)
+        for name in guarded_fields:
+            column = quote(opts.get_field(name).column)
+            assignments.append(f'{column} = CASE WHEN {guard_column} = %s THEN %s ELSE {column} END')
+    sql = 'UPDATE {table} SET {assignments} WHERE {pk} = %s'.format(
+        table=quote(opts.db_table), assignments=', '.join(assignments), pk=quote(opts.pk.column),
+    )
+
+    def prep(obj, name):
+        field = opts.get_field(name)
+        return field.get_db_prep_save(getattr(obj, field.attname), connection)
+
+    params = []
+    for obj in objs:
+        row = [prep(obj, name) for name in fields]
+        if guarded_fields:
+            guard_value = opts.get_field(guard_field).get_db_prep_save(expected(obj), connection)
+            for name in guarded_fields:
+                row += [guard_value, prep(obj, name)]
+        params.append(row + [obj.pk])
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+    return len(params)
+
+
+def rotate_passwords(pks, now=None):
+    """为指定主键的主机生成并写入新密码，返回处理的主机数
+
+    每台主机的密码不同，无法用一条 UPDATE 完成，这里用 update_rows 批量执行。
+    """
+    now = now or timezone.now()
+    fernet = get_fernet()
+    hosts = [
+        Host(pk=pk, encrypted_root_password=encrypt_password(generate_password(), fernet),
+             last_password_change=now, updated_at=now)
+        for pk in pks
+    ]
+    return update_rows(Host, hosts, ['encrypted_root_password', 'last_password_change', 'updated_at'])
+
+
+def apply_action(action, params, queryset, now=None):
+    """对主机集合执行批量操作，返回处理的主机数"""
+    now = now or timezone.now()
+    if action == 'rotate_passwords':
+        return rotate_passwords(queryset.values_list('pk', flat=True), now)
+    return queryset.update(**_update_values(action, params, now))
+
+
+def create_job(action, target, params):
+    """创建批量操作任务；目标主机数在同步上限内时直接执行完成
+
+    返回的任务状态为 pending 时，需由调用方分发 run_bulk_job 在后台执行。
+    """
+    queryset = target_hosts(target)
+    total = queryset.count()
+    job = BulkJob.objects.create(action=action, target=target, params=params, total=total)
+
+    limit = settings.BULK_ROTATE_SYNC_LIMIT if action == 'rotate_passwords' else settings.BULK_SYNC_LIMIT
+    if total <= limit:
+        now = timezone.now()
+        with transaction.atomic(using=router.db_for_write(Host)):
+            job.processed = apply_action(action, params, queryset, now)
+        job.status = 'success'
+        job.started_at = now
+        job.finished_at = timezone.now()
+        job.save()
+    return job
+
+
+def run_job(job):
+    """按主键顺序分块执行批量操作任务，从 last_host_id 处继续，返回本次处理的主机数"""
+    processed = 0
+    chunks = iter_chunks(target_hosts(job.target), ['id'], settings.BULK_CHUNK_SIZE, job.last_host_id)
+    for chunk in chunks:
+        ids = [host.pk for host in chunk]
+        with transaction.atomic(using=router.db_for_write(Host)):
+            count = apply_action(job.action, job.params, Host.objects.filter(pk__in=ids))
+            job.processed += count
+            job.last_host_id = ids[-1]
+            job.save(update_fields=['processed', 'last_host_id'])
+        processed += count
+    return processed
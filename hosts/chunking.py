@@ -0,0 +1,48 @@
+"""
+全量数据的分块处理
+
+按主键做键集分页（WHERE pk > 上一块的最大主键 ORDER BY pk LIMIT n），每块只取需要的列，
+处理完即丢弃，内存占用与总数据量无关；每块一个事务，并把已处理的最大主键记录为任务断点，
+任务中断后下一次执行可以从断点继续（见 hosts.task_runs.resume_checkpoint）。
+"""
+
+from django.conf import settings
+from django.db import router, transaction
+from .task_runs import resume_checkpoint, save_checkpoint
+
+
+def iter_chunks(queryset, fields=None, chunk_size=None, start_after=0):
+    """按主键顺序逐块返回模型实例列表，fields 指定只加载的列（主键总会加载）"""
+    chunk_size = chunk_size or settings.TASK_CHUNK_SIZE
+    queryset = queryset.order_by('pk')
+    if fields:
+        queryset = queryset.only(*fields)
+
+    last_pk = start_after
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def run_in_chunks(queryset, handler, fields=None, chunk_size=None, resume_since=None, atomic=True):
+    """分块调用 handler(chunk) 处理查询集，返回各块 handler 返回值之和
+
+    atomic=True 时每块在一个事务中处理；处理耗时很长（如网络探测）的任务应传 atomic=False，
+    只在 handler 内部的写库阶段开启事务。resume_since 不为空时，从该时间之后中断的同名任务的断点继续。
+    """
+    total = 0
+    start_after = resume_checkpoint(resume_since)
+    if start_after:
+        print(f"从断点 {queryset.model.__name__}#{start_after} 继续处理")
+
+    for chunk in iter_chunks(queryset, fields, chunk_size, start_after):
+        if atomic:
+            with transaction.atomic(using=router.db_for_write(queryset.model)):
+                total += handler(chunk) or 0
+        else:
+            total += handler(chunk) or 0
+        save_checkpoint(chunk[-1].pk)
+    return total
@@ -0,0 +1,113 @@
+"""
+root密码批量读取
+
+只查询 id / ip_address / encrypted_root_password 三列，用共享的 Fernet 实例解密，
+逐块产出结果供流式输出；数据量很大时可以把解密分摊到进程池。
+每块结果产出前先批量写入 CredentialAccessLog 审计记录；无法解密的主机在审计记录中标记为解密失败，
+并由调用方在输出末尾追加一行错误汇总（见 failure_record）。
+"""
+
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from .crypto import decrypt_passwords
+from .models import CredentialAccessLog
+
+
+def _chunks(queryset, chunk_size):
+    """用一条查询按块读取主机的 id、IP 和加密密码"""
+    rows = (
+        queryset.order_by('pk')
+        .values_list('id', 'ip_address', 'encrypted_root_password')
+        .iterator(chunk_size=chunk_size)
+    )
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _decrypt_inline(chunks):
+    for chunk in chunks:
+        yield chunk, decrypt_passwords([row[2] for row in chunk])
+
+
+def _decrypt_in_pool(chunks, workers):
+    """在进程池中解密，最多 workers*2 块在途，按原顺序产出
+
+    子进程用 spawn 方式启动，不继承父进程的数据库连接。
+    """
+    key = settings.ENCRYPTION_KEY
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(decrypt_passwords, [row[2] for row in chunk], key)))
+            if len(pending) >= workers * 2:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+class CredentialAuditor:
+    """按块批量写入密码访问审计记录"""
+
+    def __init__(self, user, source, remote_addr=None):
+        self.user = user
+        self.source = source
+        self.remote_addr = remote_addr
+        self.count = 0
+        self.failed = 0
+
+    def record(self, credentials):
+        logs = [
+            CredentialAccessLog(
+                host_id=credential['id'], ip_address=credential['ip_address'],
+                user=self.user, source=self.source, remote_addr=self.remote_addr,
+                decrypt_failed=credential['root_password'] is None,
+            )
+            for credential in credentials
+        ]
+        CredentialAccessLog.objects.bulk_create(logs)
+        self.count += len(logs)
+        self.failed += sum(log.decrypt_failed for log in logs)
+
+
+def failure_record(auditor):
+    """有主机无法解密时返回追加在输出末尾的错误汇总记录，否则返回 None"""
+    if not auditor.failed:
+        return None
+    return {
+        'error': 'decrypt_failed',
+        'failed': auditor.failed,
+        'total': auditor.count,
+        'message': f'{auditor.failed} 台主机的密码无法解密（root_password 为 null），可能是加密密钥已更换',
+    }
+
+
+def iter_credentials(queryset, auditor, workers=0, chunk_size=None):
+    """逐块解密主机集合的root密码，返回块（字典列表）的迭代器
+
+    workers 大于1时使用进程池解密；每块在产出前先写入审计记录。
+    无法解密的主机 root_password 为 None。
+    """
+    chunks = _chunks(queryset, chunk_size or settings.CREDENTIAL_CHUNK_SIZE)
+    if workers and workers > 1:
+        decrypted = _decrypt_in_pool(chunks, workers)
+    else:
+        decrypted = _decrypt_inline(chunks)
+
+    for chunk, passwords in decrypted:
+        credentials = [
+            {'id': host_id, 'ip_address': ip_address, 'root_password': password}
+            for (host_id, ip_address, _), password in zip(chunk, passwords)
+        ]
+        auditor.record(credentials)
+        yield credentials
@@ -0,0 +1,55 @@
+"""
+root密码加解密
+
+Fernet 实例按密钥缓存，批量加解密时复用同一个实例，避免每条记录重复构造。
+"""
+
+import base64
+import secrets
+import string
+from functools import lru_cache
+from cryptography.fernet import Fernet
+from django.conf import settings
+
+
+@lru_cache(maxsize=4)
+def _fernet(key):
+    return Fernet(key)
+
+
+def get_fernet(key=None):
+    """返回 key（默认为当前 ENCRYPTION_KEY）对应的 Fernet 实例"""
+    return _fernet(key or settings.ENCRYPTION_KEY)
+
+
+def encrypt_password(password, fernet=None):
+    """加密密码，返回存入 Host.encrypted_root_password 的字符串"""
+    fernet = fernet or get_fernet()
+    return base64.b64encode(fernet.encrypt(password.encode())).decode()
+
+
+def decrypt_password(encrypted_password, fernet=None):
+    """解密 Host.encrypted_root_password"""
+    fernet = fernet or get_fernet()
+    return fernet.decrypt(base64.b64decode(encrypted_password.encode())).decode()
+
+
+def decrypt_passwords(encrypted_passwords, key=None):
+    """批量解密，无法解密的返回 None
+
+    只依赖 cryptography，可以在不加载Django的子进程（进程池）中执行。
+    """
+    fernet = get_fernet(key)
+    passwords = []
+    for encrypted_password in encrypted_passwords:
+        try:
+            passwords.append(decrypt_password(encrypted_password, fernet))
+        except Exception:
+            passwords.append(None)
+    return passwords
+
+
+def generate_password(length=12):
+    """生成随机root密码（包含字母、数字和特殊字符），使用密码学安全的随机数"""
+    alphabet = string.ascii_letters + string.digits + '!@#$%^&*'
+    return ''.join(secrets.choice(alphabet) for _ in range(length))
@@ -0,0 +1,115 @@
+"""
+主机列表的服务端过滤与排序
+
+每个支持的过滤条件都有对应的 Host 索引（见 Host.Meta.indexes），保证走索引查询。
+"""
+
+import math
+from datetime import timedelta
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+# 允许的排序字段（ordering 参数，前缀 - 表示倒序）
+HOST_ORDERING_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'status': 'status',
+    # IP按数值顺序排序（ip_key 的字典序即数值序）
+    'ip_address': 'ip_key',
+    'last_password_change': 'last_password_change',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+# 未指定 ordering 时的默认排序，与 host_dc_name_idx 的列顺序一致，不需要联表或额外排序
+DEFAULT_HOST_ORDERING = ['datacenter_id', 'name', 'id']
+
+# password_older_than 允许的最大天数
+MAX_PASSWORD_AGE_DAYS = 36500
+
+
+def _parse_datetime_param(name, value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValidationError({name: '时间格式错误，应为ISO 8601格式'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _parse_int_param(name, value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: '必须为整数'})
+
+
+def _filter_name_prefix(queryset, name):
+    """名称前缀匹配
+
+    SQLite 的 LIKE 带 ESCAPE 且不区分大小写，无法使用索引，改用范围条件；该写法依赖默认 BINARY
+    排序规则按码位比较，在其他排序规则（如 PostgreSQL 的 en_US）下不成立，其他数据库仍用 LIKE 'x%'
+    （PostgreSQL 使用 varchar_pattern_ops 索引 host_name_pattern_idx，见迁移 0015）。
+    """
+    if connections[queryset.db].vendor == 'sqlite':
+        return queryset.filter(name__gte=name, name__lt=name + '\U0010ffff')
+    return queryset.filter(name__startswith=name)
+
+
+def filter_hosts(queryset, params):
+    """按查询参数过滤主机
+
+    支持: status, datacenter_id, city_id, name（前缀匹配）, cidr（网段，如 10.0.0.0/16）,
+    password_older_than（密码超过N天未修改）, updated_since（ISO时间）
+    """
+    status = params.get('status')
+    datacenter_id = params.get('datacenter_id')
+    city_id = params.get('city_id')
+    name = params.get('name')
+    cidr = params.get('cidr')
+    password_older_than = params.get('password_older_than')
+    updated_since = params.get('updated_since')
+
+    if status:
+        queryset = queryset.filter(status=status)
+    if datacenter_id:
+        queryset = queryset.filter(datacenter_id=_parse_int_param('datacenter_id', datacenter_id))
+    if city_id:
+        queryset = queryset.filter(datacenter__city_id=_parse_int_param('city_id', city_id))
+    if name:
+        queryset = _filter_name_prefix(queryset, name)
+    if cidr:
+        try:
+            queryset = queryset.in_cidr(cidr)
+        except ValueError:
+            raise ValidationError({'cidr': '网段格式错误，应为CIDR格式，如 10.0.0.0/16'})
+    if password_older_than:
+        try:
+            days = float(password_older_than)
+        except ValueError:
+            raise ValidationError({'password_older_than': '必须为天数'})
+        if not math.isfinite(days) or not 0 <= days <= MAX_PASSWORD_AGE_DAYS:
+            raise ValidationError({'password_older_than': f'天数应在 0 到 {MAX_PASSWORD_AGE_DAYS} 之间'})
+        queryset = queryset.filter(last_password_change__lt=timezone.now() - timedelta(days=days))
+    if updated_since:
+        queryset = queryset.filter(updated_at__gte=_parse_datetime_param('updated_since', updated_since))
+    return queryset
+
+
+def order_hosts(queryset, ordering):
+    """按白名单中的字段排序，多个字段用逗号分隔；未指定时按 DEFAULT_HOST_ORDERING 排序"""
+    if not ordering:
+        return queryset.order_by(*DEFAULT_HOST_ORDERING)
+    fields = []
+    for item in ordering.split(','):
+        item = item.strip()
+        descending = item.startswith('-')
+        field = HOST_ORDERING_FIELDS.get(item.lstrip('-'))
+        if field is None:
+            raise ValidationError({'ordering': f'不支持的排序字段: {item}'})
+        fields.append(f'-{field}' if descending else field)
+    # 追加主键保证分页顺序稳定
+    return queryset.order_by(*fields, 'id')
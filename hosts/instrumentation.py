@@ -0,0 +1,79 @@
+"""
+性能采集工具
+
+QueryStats 通过 connection.execute_wrapper 统计SQL条数与耗时；
+profile_to 可选地使用 cProfile 或 pyinstrument 保存一次执行的性能剖析结果。
+"""
+
+import time
+from contextlib import ExitStack, contextmanager
+from django.db import connections
+
+
+class QueryStats:
+    """统计代码块内所有数据库连接上执行的SQL"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_sql = ''
+        self.slowest_time = 0.0
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.total_time += elapsed
+            if elapsed >= self.slowest_time:
+                self.slowest_time = elapsed
+                self.slowest_sql = sql
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        self._stack = None
+        return False
+
+
+@contextmanager
+def profile_to(path, profiler='cprofile'):
+    """剖析代码块并写入 path；profiler 为 'pyinstrument' 且已安装时输出HTML，否则输出cProfile统计文件
+
+    产出实际写入的文件路径。
+    """
+    if profiler == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            profiler = 'cprofile'
+
+    if profiler == 'pyinstrument':
+        path = f'{path}.html'
+        profile = Profiler()
+        profile.start()
+        try:
+            yield path
+        finally:
+            profile.stop()
+            with open(path, 'w') as f:
+                f.write(profile.output_html())
+    else:
+        import cProfile
+
+        path = f'{path}.prof'
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield path
+        finally:
+            profile.disable()
+            profile.dump_stats(path)
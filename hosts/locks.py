@@ -0,0 +1,140 @@
+"""
+定时任务分布式锁
+
+默认使用Redis（SET NX PX），本地测试可将 TASK_LOCK_BACKEND 设为 'db' 使用数据库锁表。
+锁带有过期时间（租约），持有者进程崩溃后锁会自动失效；长时间执行的任务在处理过程中续租，
+因此租约可以远短于任务的执行时间，崩溃后很快就能被下一次调度接管。
+"""
+
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
+
+
+class LeaseLost(Exception):
+    """锁租约已过期并被其他实例获取，当前执行应立即停止"""
+
+
+class RedisLockBackend:
+    """基于Redis的锁"""
+    key_prefix = 'hosts:lock:'
+
+    # 仅当锁仍由自己持有时才删除，避免误删他人重新获取的锁
+    RELEASE_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    # 仅当锁仍由自己持有时才延长过期时间
+    RENEW_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('pexpire', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def _key(self, name):
+        return f'{self.key_prefix}{name}'
+
+    def acquire(self, name, token, ttl):
+        return bool(self.client.set(self._key(name), token, nx=True, px=int(ttl * 1000)))
+
+    def release(self, name, token):
+        self.client.eval(self.RELEASE_SCRIPT, 1, self._key(name), token)
+
+    def renew(self, name, token, ttl):
+        return bool(self.client.eval(self.RENEW_SCRIPT, 1, self._key(name), token, int(ttl * 1000)))
+
+    def mark_pending(self, name):
+        self.client.set(f'{self._key(name)}:pending', 1)
+
+    def pop_pending(self, name):
+        return bool(self.client.getdel(f'{self._key(name)}:pending'))
+
+
+class DatabaseLockBackend:
+    """基于数据库的锁，用于本地开发和测试"""
+
+    def acquire(self, name, token, ttl):
+        from .models import TaskLock
+
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=ttl)
+        # 接管已过期的锁
+        if TaskLock.objects.filter(name=name, expires_at__lte=now).update(token=token, expires_at=expires_at):
+            return True
+        try:
+            with transaction.atomic(using=router.db_for_write(TaskLock)):
+                TaskLock.objects.create(name=name, token=token, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        return True
+
+    def release(self, name, token):
+        from .models import TaskLock
+
+        TaskLock.objects.filter(name=name, token=token).update(expires_at=timezone.now())
+
+    def renew(self, name, token, ttl):
+        from .models import TaskLock
+
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+        return bool(TaskLock.objects.filter(name=name, token=token).update(expires_at=expires_at))
+
+    def mark_pending(self, name):
+        from .models import TaskLock
+
+        TaskLock.objects.filter(name=name).update(pending=True)
+
+    def pop_pending(self, name):
+        from .models import TaskLock
+
+        return bool(TaskLock.objects.filter(name=name, pending=True).update(pending=False))
+
+
+def get_lock_backend():
+    """根据 settings.TASK_LOCK_BACKEND 返回锁实现"""
+    if getattr(settings, 'TASK_LOCK_BACKEND', 'redis') == 'db':
+        return DatabaseLockBackend()
+    url = getattr(settings, 'TASK_LOCK_REDIS_URL', None) or settings.CELERY_BROKER_URL
+    return RedisLockBackend(url)
+
+
+class Lease:
+    """task_lock 产出的锁租约，布尔值为是否获取成功"""
+
+    def __init__(self, backend, name, token, ttl, acquired):
+        self.backend = backend
+        self.name = name
+        self.token = token
+        self.ttl = ttl
+        self.acquired = acquired
+
+    def __bool__(self):
+        return self.acquired
+
+    def renew(self):
+        """把过期时间延长为当前时间之后 ttl 秒，返回锁是否仍由自己持有"""
+        return self.acquired and self.backend.renew(self.name, self.token, self.ttl)
+
+
+@contextmanager
+def task_lock(name, ttl, backend=None):
+    """获取名为 name 的锁，产出租约（Lease，可据其布尔值判断是否获取成功）；成功时在退出时释放"""
+    backend = backend or get_lock_backend()
+    token = uuid.uuid4().hex
+    lease = Lease(backend, name, token, ttl, backend.acquire(name, token, ttl))
+    try:
+        yield lease
+    finally:
+        if lease:
+            backend.release(name, token)
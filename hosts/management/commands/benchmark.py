@@ -0,0 +1,206 @@
+import json
+import math
+import os
+import platform
+import time
+import zlib
+from contextlib import redirect_stdout
+from datetime import datetime
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.utils import timezone
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+from host_management.celery import app
+from hosts.instrumentation import QueryStats
+from hosts.middleware import brotli
+from hosts.models import Host
+from hosts.renderers import FastJSONRenderer
+from hosts.serializers import HostSerializer
+from hosts import tasks
+
+
+def local_probe(ip_address, timeout=5):
+    """本地替身探测函数：不发包，按IP确定性地返回约95%可达"""
+    return {'ip_address': ip_address, 'is_reachable': zlib.crc32(ip_address.encode()) % 20 != 0}
+
+
+def percentile(values, pct):
+    """最近秩法百分位数"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    help = '对API接口和后台任务进行性能基准测试，结果输出为JSON，可与基线对比'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000', help='主机规模列表，逗号分隔')
+        parser.add_argument('--page-sizes', default='10,100,1000', help='列表接口的分页大小，逗号分隔')
+        parser.add_argument('--iterations', type=int, default=20, help='每个接口用例的请求次数')
+        parser.add_argument('--task-iterations', type=int, default=3, help='每个任务用例的执行次数')
+        parser.add_argument('--output', help='结果JSON写入路径，默认输出到标准输出')
+        parser.add_argument('--compare', help='基线JSON路径，对比并标记性能回退')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='p50耗时相对基线增长超过该比例视为回退（默认0.2即20%%）')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        page_sizes = [int(size) for size in options['page_sizes'].split(',')]
+        self.iterations = options['iterations']
+        self.task_iterations = options['task_iterations']
+
+        # 在独立的测试数据库中运行，不影响现有数据
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            # 任务中逐条主机的print输出丢弃，避免混入JSON结果
+            with override_settings(TASK_LOCK_BACKEND='db', HOST_PROBER=f'{__name__}.local_probe',
+                                   REQUEST_QUERY_BUDGET=None), \
+                    open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                results = {}
+                for size in sizes:
+                    self.stderr.write(f'准备 {size} 台主机的数据...')
+                    call_command('generate_fleet', hosts=size, days=7, clear=True, stdout=devnull)
+                    results[str(size)] = self.run_cases(page_sizes)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'iterations': self.iterations,
+                'task_iterations': self.task_iterations,
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            self.stderr.write(f'结果已写入 {options["output"]}')
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            self.compare(report, options['compare'], options['threshold'])
+
+    def run_cases(self, page_sizes):
+        client = Client()
+        results = {}
+        host_id = Host.objects.values_list('id', flat=True).first()
+        host_count = Host.objects.count()
+
+        for page_size in page_sizes:
+            results[f'api.hosts.list.page_{page_size}'] = self.measure(
+                lambda: client.get('/api/hosts/', {'page_size': page_size}), self.iterations, min(page_size, host_count)
+            )
+        results['api.hosts.detail'] = self.measure(lambda: client.get(f'/api/hosts/{host_id}/'), self.iterations)
+
+        # 中间件开销：同一请求在有/无 RequestTimeMiddleware 时的耗时
+        results['middleware.with'] = self.measure(lambda: client.get('/api/cities/'), self.iterations)
+        without = [m for m in settings.MIDDLEWARE if m != 'hosts.middleware.RequestTimeMiddleware']
+        with override_settings(MIDDLEWARE=without):
+            # 中间件链在处理器首次请求时构建，必须用新的 Client 才能使新的 MIDDLEWARE 生效
+            bare_client = Client()
+            results['middleware.without'] = self.measure(lambda: bare_client.get('/api/cities/'), self.iterations)
+        # 去掉中间件后少了写入请求日志的SQL，否则说明对照组实际仍在使用该中间件
+        if results['middleware.without']['queries'] >= results['middleware.with']['queries']:
+            raise CommandError('middleware.without 的SQL条数未减少，RequestTimeMiddleware 未被移除')
+
+        results['task.generate_daily_statistics'] = self.measure(tasks.generate_daily_statistics, self.task_iterations)
+        results['task.change_host_passwords'] = self.measure(tasks.change_host_passwords, self.task_iterations, host_count)
+        results['task.ping_all_hosts'] = self.measure(tasks.ping_all_hosts, self.task_iterations, host_count)
+
+        results.update(self.render_cases())
+
+        eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+        try:
+            results['task.start_ping_sweep'] = self.measure(
+                lambda: tasks.start_ping_sweep.delay().get(), self.task_iterations, host_count
+            )
+            # 每次执行前把所有主机设为到期，测量一次满批量认领、分发和并发探测的开销
+            results['task.probe_due_hosts'] = self.measure(
+                tasks.probe_due_hosts, self.task_iterations, min(host_count, settings.PROBE_BATCH_SIZE),
+                setup=lambda: Host.objects.update(next_probe_at=timezone.now()),
+            )
+        finally:
+            app.conf.task_always_eager = eager
+        return results
+
+    def render_cases(self):
+        """1000行 HostSerializer 数据分别用标准库和 orjson 编码的耗时与字节数"""
+        rows = HostSerializer(Host.objects.select_related('datacenter__city')[:1000], many=True).data
+        payload = {'count': len(rows), 'next': None, 'previous': None, 'results': rows}
+
+        results = {}
+        for name, renderer in [('stdlib', JSONRenderer()), ('fast', FastJSONRenderer())]:
+            result = self.measure(lambda: renderer.render(payload), self.iterations, len(rows))
+            body = renderer.render(payload)
+            result['bytes'] = len(body)
+            result['gzip_bytes'] = len(compress_string(body))
+            if brotli is not None:
+                result['br_bytes'] = len(brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY))
+            results[f'render.hosts_page_1000.{name}'] = result
+        return results
+
+    def measure(self, func, iterations, items_per_call=1, setup=None):
+        """执行 func 若干次，返回耗时分布、吞吐量和平均SQL条数；setup 在每次执行前调用，不计入耗时"""
+        timings = []
+        query_counts = []
+        for _ in range(iterations):
+            if setup is not None:
+                setup()
+            with QueryStats() as queries:
+                start = time.perf_counter()
+                result = func()
+                timings.append(time.perf_counter() - start)
+            query_counts.append(queries.count)
+            if getattr(result, 'status_code', 200) >= 400:
+                raise CommandError(f'请求失败: {result.status_code}')
+        total = sum(timings)
+        return {
+            'iterations': iterations,
+            'p50_ms': percentile(timings, 50) * 1000,
+            'p99_ms': percentile(timings, 99) * 1000,
+            'mean_ms': total / iterations * 1000,
+            'throughput': iterations * items_per_call / total if total else None,
+            'queries': sum(query_counts) / iterations,
+        }
+
+    def compare(self, report, baseline_path, threshold):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+        regressions = []
+        for size, cases in report['results'].items():
+            for case, current in cases.items():
+                previous = baseline.get('results', {}).get(size, {}).get(case)
+                if not previous:
+                    continue
+                change = (current['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] if previous['p50_ms'] else 0
+                flags = []
+                if change > threshold:
+                    flags.append(f'p50 {previous["p50_ms"]:.2f}ms -> {current["p50_ms"]:.2f}ms ({change:+.0%})')
+                if current['queries'] > previous['queries']:
+                    flags.append(f'SQL {previous["queries"]:.1f} -> {current["queries"]:.1f}')
+                if flags:
+                    regressions.append(f'[{size}] {case}: ' + '; '.join(flags))
+
+        if regressions:
+            for line in regressions:
+                self.stderr.write(self.style.ERROR(line))
+            raise CommandError(f'发现 {len(regressions)} 项性能回退')
+        self.stderr.write(self.style.SUCCESS('与基线相比未发现性能回退'))
@@ -0,0 +1,63 @@
+import getpass
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from hosts.bulk import target_hosts
+from hosts.credentials import CredentialAuditor, failure_record, iter_credentials
+from hosts.renderers import ndjson_line
+from hosts.serializers import BulkTargetSerializer
+
+
+class Command(BaseCommand):
+    help = '批量导出主机root密码（NDJSON，每行一台主机），访问记录写入审计日志；有主机无法解密时以非零状态退出'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', help='主机ID列表，逗号分隔')
+        parser.add_argument('--datacenter', type=int, help='机房ID')
+        parser.add_argument('--city', type=int, help='城市ID')
+        parser.add_argument('--cidr', help='网段，如 10.0.0.0/16')
+        parser.add_argument('--workers', type=int, default=0, help='解密进程数，0或1表示在当前进程解密')
+        parser.add_argument('--chunk-size', type=int, default=None, help='每块主机数，默认 CREDENTIAL_CHUNK_SIZE')
+        parser.add_argument('--output', help='输出文件路径，默认输出到标准输出')
+        parser.add_argument('--user', default=getpass.getuser(), help='审计日志中记录的访问者')
+
+    def handle(self, *args, **options):
+        target = {}
+        if options['ids'] is not None:
+            try:
+                target['ids'] = [int(pk) for pk in options['ids'].split(',')]
+            except ValueError:
+                raise CommandError('--ids 必须为逗号分隔的整数')
+        for option, key in [('datacenter', 'datacenter_id'), ('city', 'city_id'), ('cidr', 'cidr')]:
+            if options[option] is not None:
+                target[key] = options[option]
+
+        serializer = BulkTargetSerializer(data=target)
+        if not serializer.is_valid():
+            raise CommandError(serializer.errors)
+
+        auditor = CredentialAuditor(options['user'], 'command')
+        chunks = iter_credentials(
+            target_hosts(serializer.validated_data), auditor,
+            workers=options['workers'], chunk_size=options['chunk_size'],
+        )
+
+        start = time.perf_counter()
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for credentials in chunks:
+                output.write(b''.join(ndjson_line(credential) for credential in credentials))
+            failure = failure_record(auditor)
+            if failure is not None:
+                output.write(ndjson_line(failure))
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
+
+        elapsed = time.perf_counter() - start
+        rate = auditor.count / elapsed if elapsed else 0
+        self.stderr.write(f'已导出 {auditor.count} 台主机的密码，耗时 {elapsed:.2f}s（{rate:.0f} 条/秒）')
+        if failure is not None:
+            raise CommandError(failure['message'])
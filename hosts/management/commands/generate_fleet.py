@@ -0,0 +1,210 @@
+import ipaddress
+import random
+import string
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+from django.utils import timezone
+from hosts.crypto import encrypt_password, get_fernet
+from hosts.models import City, DataCenter, Host, HostStatistics, RequestLog
+
+
+STATUSES = ['active', 'inactive', 'maintenance']
+
+LOG_PATHS = [
+    ('GET', '/api/hosts/'),
+    ('GET', '/api/hosts/{id}/'),
+    ('POST', '/api/hosts/{id}/ping/'),
+    ('GET', '/api/statistics/'),
+    ('GET', '/api/datacenters/'),
+    ('GET', '/api/cities/'),
+    ('PATCH', '/api/hosts/{id}/'),
+]
+
+
+def parse_status_mix(value):
+    """解析 'active=80,inactive=10,maintenance=10' 形式的状态比例"""
+    weights = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in STATUSES:
+            raise CommandError(f'未知状态: {name}')
+        try:
+            weights[name] = float(weight)
+        except ValueError:
+            raise CommandError(f'状态比例格式错误: {part}')
+    if not weights or sum(weights.values()) <= 0:
+        raise CommandError('状态比例之和必须大于0')
+    return weights
+
+
+class Command(BaseCommand):
+    help = '生成用于压测的大规模主机数据（城市/机房/主机及历史统计和请求日志）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cities', type=int, default=10, help='城市数')
+        parser.add_argument('--datacenters', type=int, default=3, help='每个城市的机房数')
+        parser.add_argument('--hosts', type=int, default=10000, help='主机总数')
+        parser.add_argument('--status-mix', default='active=80,inactive=10,maintenance=10',
+                            help='主机状态比例，如 active=80,inactive=10,maintenance=10')
+        parser.add_argument('--days', type=int, default=0, help='生成多少天的历史统计和请求日志')
+        parser.add_argument('--logs-per-day', type=int, default=1000, help='每天生成的请求日志条数')
+        parser.add_argument('--seed', type=int, default=42, help='随机种子，相同参数生成相同数据')
+        parser.add_argument('--batch-size', type=int, default=5000, help='每批写入的记录数')
+        parser.add_argument('--ip-base', default='10.0.0.0', help='分配主机IP的起始地址（IPv4）')
+        parser.add_argument('--prefix', default='GEN', help='生成的城市/机房代码前缀')
+        parser.add_argument('--clear', action='store_true', help='先删除同前缀的已生成数据')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+        status_mix = parse_status_mix(options['status_mix'])
+        started = time.perf_counter()
+
+        if options['clear']:
+            self.clear(prefix)
+
+        datacenters = self.create_topology(prefix, options['cities'], options['datacenters'])
+        host_count = self.create_hosts(datacenters, options['hosts'], status_mix, options['ip_base'])
+
+        if options['days']:
+            self.create_statistics(datacenters, options['days'])
+            self.create_request_logs(options['days'], options['logs_per_day'], host_count)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'生成完成！{options["cities"]} 个城市，{len(datacenters)} 个机房，{host_count} 台主机，'
+            f'{options["days"]} 天历史数据，耗时 {time.perf_counter() - started:.1f}s'
+        ))
+
+    def clear(self, prefix):
+        cities = City.objects.filter(code__startswith=f'{prefix}-')
+        HostStatistics.objects.filter(city__in=cities).delete()
+        Host.objects.filter(datacenter__city__in=cities).delete()
+        DataCenter.objects.filter(city__in=cities).delete()
+        cities.delete()
+        self.stdout.write(f'已清除前缀为 {prefix} 的生成数据')
+
+    def create_topology(self, prefix, num_cities, datacenters_per_city):
+        cities = City.objects.bulk_create([
+            City(name=f'城市{i + 1:03d}', code=f'{prefix}-C{i + 1:03d}')
+            for i in range(num_cities)
+        ])
+        # bulk_create 在部分数据库上不回填主键，重新查询
+        cities = list(City.objects.filter(code__in=[c.code for c in cities]).order_by('code'))
+
+        DataCenter.objects.bulk_create([
+            DataCenter(
+                name=f'{city.name}机房{j + 1}',
+                code=f'{city.code}-D{j + 1:02d}',
+                city=city,
+                address=f'{city.name}机房{j + 1}地址',
+            )
+            for city in cities
+            for j in range(datacenters_per_city)
+        ])
+        datacenters = list(
+            DataCenter.objects.filter(city__in=cities).select_related('city').order_by('code')
+        )
+        self.stdout.write(f'创建 {len(cities)} 个城市，{len(datacenters)} 个机房')
+        return datacenters
+
+    def allocate_ips(self, ip_base, count):
+        """从 ip_base 开始顺序分配不重复的IPv4地址，跳过 .0 和 .255"""
+        base = int(ipaddress.IPv4Address(ip_base))
+        for i in range(count):
+            block, offset = divmod(i, 254)
+            yield str(ipaddress.IPv4Address(base + block * 256 + offset + 1))
+
+    def create_hosts(self, datacenters, total, status_mix, ip_base):
+        if not datacenters:
+            return 0
+        fernet = get_fernet()
+        statuses, weights = zip(*status_mix.items())
+        alphabet = string.ascii_letters + string.digits + '!@#$%^&*'
+        per_datacenter, remainder = divmod(total, len(datacenters))
+
+        # 每个机房分配连续的地址段，便于按网段查询
+        ips = self.allocate_ips(ip_base, total)
+        batch = []
+        created = 0
+        for index, datacenter in enumerate(datacenters):
+            for n in range(per_datacenter + (1 if index < remainder else 0)):
+                password = ''.join(self.rng.choices(alphabet, k=12))
+                batch.append(Host(
+                    name=f'{datacenter.code}-host-{n + 1:06d}',
+                    ip_address=next(ips),
+                    datacenter=datacenter,
+                    status=self.rng.choices(statuses, weights)[0],
+                    encrypted_root_password=encrypt_password(password, fernet),
+                ))
+                if len(batch) >= self.batch_size:
+                    created += self.flush(Host, batch)
+                    batch = []
+        created += self.flush(Host, batch)
+        self.stdout.write(f'创建 {created} 台主机')
+        return created
+
+    def create_statistics(self, datacenters, days):
+        counts = {}
+        for datacenter_id, status in Host.objects.filter(datacenter__in=datacenters).values_list('datacenter_id', 'status').iterator():
+            counts.setdefault(datacenter_id, dict.fromkeys(STATUSES, 0))[status] += 1
+
+        today = timezone.localdate()
+        batch = []
+        created = 0
+        for datacenter in datacenters:
+            current = counts.get(datacenter.pk, dict.fromkeys(STATUSES, 0))
+            for day in range(days):
+                # 历史数据在当前分布上随机抖动
+                values = {status: max(0, int(count * self.rng.uniform(0.9, 1.1))) for status, count in current.items()}
+                batch.append(HostStatistics(
+                    city=datacenter.city,
+                    datacenter=datacenter,
+                    date=today - timedelta(days=day + 1),
+                    total_hosts=sum(values.values()),
+                    active_hosts=values['active'],
+                    inactive_hosts=values['inactive'],
+                    maintenance_hosts=values['maintenance'],
+                ))
+                if len(batch) >= self.batch_size:
+                    created += self.flush(HostStatistics, batch)
+                    batch = []
+        created += self.flush(HostStatistics, batch)
+        self.stdout.write(f'创建 {created} 条历史统计')
+
+    def create_request_logs(self, days, logs_per_day, host_count):
+        now = timezone.now()
+        batch = []
+        created = 0
+        for day in range(days):
+            day_start = now - timedelta(days=day + 1)
+            for _ in range(logs_per_day):
+                method, path = self.rng.choice(LOG_PATHS)
+                status_code = self.rng.choices([200, 201, 400, 404, 500], [90, 3, 3, 3, 1])[0]
+                batch.append(RequestLog(
+                    path=path.format(id=self.rng.randint(1, max(host_count, 1))),
+                    method=method,
+                    response_time=self.rng.lognormvariate(3, 0.8),
+                    status_code=status_code,
+                    user_agent='generate_fleet',
+                    ip_address=f'192.168.{self.rng.randint(0, 255)}.{self.rng.randint(1, 254)}',
+                    query_count=self.rng.randint(1, 30),
+                    sql_time=self.rng.uniform(0.1, 20),
+                    created_at=day_start + timedelta(seconds=self.rng.uniform(0, 86400)),
+                ))
+                if len(batch) >= self.batch_size:
+                    created += self.flush(RequestLog, batch)
+                    batch = []
+        created += self.flush(RequestLog, batch)
+        self.stdout.write(f'创建 {created} 条请求日志')
+
+    def flush(self, model, objects):
+        """在单个事务中批量写入一批对象"""
+        if not objects:
+            return 0
+        with transaction.atomic(using=router.db_for_write(model)):
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+        return len(objects)
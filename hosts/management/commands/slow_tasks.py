@@ -0,0 +1,35 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from hosts.models import TaskRun
+
+
+class Command(BaseCommand):
+    help = '列出最近最慢的任务执行记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10, help='显示条数')
+        parser.add_argument('--hours', type=float, default=24, help='统计最近多少小时')
+        parser.add_argument('--task', help='只显示指定任务（完整任务名）')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options['hours'])
+        runs = TaskRun.objects.filter(started_at__gte=since).exclude(status='skipped').exclude(duration=None)
+        if options['task']:
+            runs = runs.filter(task_name=options['task'])
+        runs = runs.order_by('-duration')[:options['limit']]
+
+        self.stdout.write(
+            f"{'任务':<40} {'开始时间':<20} {'状态':<8} {'耗时(s)':>9} {'CPU(s)':>9} "
+            f"{'SQL条数':>8} {'SQL(s)':>9} {'条目数':>8} {'条目/s':>9}"
+        )
+        for run in runs:
+            throughput = f'{run.throughput:.1f}' if run.throughput else '-'
+            self.stdout.write(
+                f"{run.task_name:<40} {timezone.localtime(run.started_at):%Y-%m-%d %H:%M:%S} "
+                f"{run.get_status_display():<8} {run.duration:>9.3f} {run.cpu_time or 0:>9.3f} "
+                f"{run.query_count or 0:>8} {run.query_time or 0:>9.3f} "
+                f"{run.item_count if run.item_count is not None else '-':>8} {throughput:>9}"
+            )
+            if run.profile_path:
+                self.stdout.write(f"    剖析文件: {run.profile_path}")
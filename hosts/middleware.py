@@ -1,36 +1,117 @@
+import logging
 import time
-from django.utils.deprecation import MiddlewareMixin
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from .instrumentation import QueryStats
 from .models import RequestLog
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
-class RequestTimeMiddleware(MiddlewareMixin):
-    """请求耗时统计中间件"""
-    
-    def process_request(self, request):
-        """请求开始时的处理"""
+logger = logging.getLogger(__name__)
+
+
+def get_client_ip(request):
+    """获取客户端IP地址（优先使用 X-Forwarded-For 中的第一个地址）"""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0]
+    return request.META.get('REMOTE_ADDR', '0.0.0.0')
+
+
+class RequestTimeMiddleware:
+    """请求耗时统计中间件
+
+    除总耗时外还统计请求内的SQL条数、SQL总耗时和最慢的一条SQL，
+    写入 RequestLog 并通过 Server-Timing 响应头返回；SQL条数超过
+    REQUEST_QUERY_BUDGET 的请求会被标记并记录警告。
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
         request.start_time = time.time()
-    
+        with QueryStats() as queries:
+            response = self.get_response(request)
+
+        # 计算响应时间（毫秒）
+        response_time = (time.time() - request.start_time) * 1000
+        sql_time = queries.total_time * 1000
+
+        budget = getattr(settings, 'REQUEST_QUERY_BUDGET', None)
+        over_budget = budget is not None and queries.count > budget
+        if over_budget:
+            logger.warning('%s %s 执行了 %d 条SQL，超过预算 %d', request.method, request.path, queries.count, budget)
+
+        response['Server-Timing'] = (
+            f'total;dur={response_time:.1f}, '
+            f'db;dur={sql_time:.1f};desc="{queries.count} queries"'
+        )
+
+        # 记录请求日志
+        RequestLog.objects.create(
+            path=request.path,
+            method=request.method,
+            response_time=response_time,
+            status_code=response.status_code,
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            ip_address=get_client_ip(request),
+            query_count=queries.count,
+            sql_time=sql_time,
+            slowest_query=queries.slowest_sql[:2000],
+            over_query_budget=over_budget,
+        )
+
+        return response
+
+
+def _accepted_encodings(header):
+    """解析 Accept-Encoding，返回 q>0 的编码集合"""
+    encodings = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0
+        if name and q > 0:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """响应压缩中间件
+
+    gzip 压缩沿用 Django 的 GZipMiddleware（BREACH 随机填充、同步/异步流式响应、压缩后不变小则不压缩），
+    只增加 brotli 协商：安装了 brotli 且客户端接受 br 时，非流式响应优先使用 br。
+    只压缩不小于 COMPRESSION_MIN_SIZE 字节的响应。
+    br 格式没有可插入随机填充的位置，需要防范 BREACH 的页面（响应中同时包含密钥和用户输入）不应依赖它。
+    """
+
     def process_response(self, request, response):
-        """请求结束时的处理"""
-        if hasattr(request, 'start_time'):
-            # 计算响应时间（毫秒）
-            response_time = (time.time() - request.start_time) * 1000
-            
-            # 获取客户端IP地址
-            x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-            if x_forwarded_for:
-                ip_address = x_forwarded_for.split(',')[0]
-            else:
-                ip_address = request.META.get('REMOTE_ADDR', '0.0.0.0')
-            
-            # 记录请求日志
-            RequestLog.objects.create(
-                path=request.path,
-                method=request.method,
-                response_time=response_time,
-                status_code=response.status_code,
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                ip_address=ip_address
-            )
-        
-        return response 
\ No newline at end of file
+        if not response.streaming and len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+        if (brotli is None or response.streaming or response.has_header('Content-Encoding')
+                or 'br' not in _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4))
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(response.content))
+
+        # 内容编码改变后强ETag不再成立，改为弱ETag
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PingSweep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('strategy', models.CharField(choices=[('datacenter', '按机房分片'), ('hash', '按ID哈希分片')], default='datacenter', max_length=20, verbose_name='分片策略')),
+                ('shard_count', models.IntegerField(default=0, verbose_name='分片数')),
+                ('status', models.CharField(choices=[('running', '执行中'), ('success', '成功'), ('failed', '部分失败')], default='running', max_length=20, verbose_name='状态')),
+                ('completed_shards', models.IntegerField(default=0, verbose_name='已完成分片数')),
+                ('failed_shards', models.IntegerField(default=0, verbose_name='失败分片数')),
+                ('total_hosts', models.IntegerField(default=0, verbose_name='已探测主机数')),
+                ('reachable_hosts', models.IntegerField(default=0, verbose_name='可达主机数')),
+                ('unreachable_hosts', models.IntegerField(default=0, verbose_name='不可达主机数')),
+                ('changed_hosts', models.IntegerField(default=0, verbose_name='状态变更主机数')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+            ],
+            options={
+                'verbose_name': 'ping巡检',
+                'verbose_name_plural': 'ping巡检',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PingSweepShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard_key', models.CharField(max_length=50, verbose_name='分片键')),
+                ('queue', models.CharField(blank=True, max_length=100, verbose_name='执行队列')),
+                ('status', models.CharField(choices=[('pending', '等待中'), ('running', '执行中'), ('success', '成功'), ('failed', '失败')], default='pending', max_length=20, verbose_name='状态')),
+                ('attempts', models.IntegerField(default=0, verbose_name='执行次数')),
+                ('host_count', models.IntegerField(default=0, verbose_name='主机数')),
+                ('reachable_count', models.IntegerField(default=0, verbose_name='可达数')),
+                ('unreachable_count', models.IntegerField(default=0, verbose_name='不可达数')),
+                ('changed_count', models.IntegerField(default=0, verbose_name='状态变更数')),
+                ('error_message', models.TextField(blank=True, verbose_name='错误信息')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+                ('sweep', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='hosts.pingsweep', verbose_name='所属巡检')),
+            ],
+            options={
+                'verbose_name': 'ping巡检分片',
+                'verbose_name_plural': 'ping巡检分片',
+                'ordering': ['sweep', 'shard_key'],
+                'unique_together': {('sweep', 'shard_key')},
+            },
+        ),
+    ]
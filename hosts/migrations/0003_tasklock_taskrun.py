@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0002_pingsweep_pingsweepshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True, verbose_name='锁名称')),
+                ('token', models.CharField(max_length=64, verbose_name='持有者标识')),
+                ('expires_at', models.DateTimeField(verbose_name='过期时间')),
+                ('pending', models.BooleanField(default=False, verbose_name='有被合并的执行')),
+            ],
+            options={
+                'verbose_name': '任务锁',
+                'verbose_name_plural': '任务锁',
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_name', models.CharField(max_length=200, verbose_name='任务名称')),
+                ('task_id', models.CharField(blank=True, max_length=100, verbose_name='Celery任务ID')),
+                ('status', models.CharField(choices=[('running', '执行中'), ('success', '成功'), ('failed', '失败'), ('skipped', '已跳过')], default='running', max_length=20, verbose_name='状态')),
+                ('published_at', models.DateTimeField(blank=True, null=True, verbose_name='投递时间')),
+                ('started_at', models.DateTimeField(verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+                ('duration', models.FloatField(blank=True, null=True, verbose_name='耗时(秒)')),
+                ('lag', models.FloatField(blank=True, null=True, verbose_name='排队延迟(秒)')),
+                ('item_count', models.IntegerField(blank=True, null=True, verbose_name='处理条目数')),
+                ('error_message', models.TextField(blank=True, verbose_name='错误信息')),
+            ],
+            options={
+                'verbose_name': '任务执行记录',
+                'verbose_name_plural': '任务执行记录',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['task_name', 'started_at'], name='hosts_taskr_task_na_2d2132_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0003_tasklock_taskrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskrun',
+            name='cpu_time',
+            field=models.FloatField(blank=True, null=True, verbose_name='CPU时间(秒)'),
+        ),
+        migrations.AddField(
+            model_name='taskrun',
+            name='profile_path',
+            field=models.CharField(blank=True, max_length=500, verbose_name='性能剖析文件'),
+        ),
+        migrations.AddField(
+            model_name='taskrun',
+            name='query_count',
+            field=models.IntegerField(blank=True, null=True, verbose_name='SQL条数'),
+        ),
+        migrations.AddField(
+            model_name='taskrun',
+            name='query_time',
+            field=models.FloatField(blank=True, null=True, verbose_name='SQL耗时(秒)'),
+        ),
+    ]
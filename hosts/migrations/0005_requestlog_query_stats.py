@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0004_taskrun_instrumentation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestlog',
+            name='over_query_budget',
+            field=models.BooleanField(default=False, verbose_name='超出SQL预算'),
+        ),
+        migrations.AddField(
+            model_name='requestlog',
+            name='query_count',
+            field=models.IntegerField(default=0, verbose_name='SQL条数'),
+        ),
+        migrations.AddField(
+            model_name='requestlog',
+            name='slowest_query',
+            field=models.TextField(blank=True, verbose_name='最慢SQL'),
+        ),
+        migrations.AddField(
+            model_name='requestlog',
+            name='sql_time',
+            field=models.FloatField(default=0, verbose_name='SQL耗时(毫秒)'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0005_requestlog_query_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='requestlog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='请求时间'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0006_requestlog_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='host',
+            index=models.Index(fields=['datacenter', 'name'], name='host_dc_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='host',
+            index=models.Index(fields=['datacenter', 'status'], name='host_dc_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='host',
+            index=models.Index(fields=['status', 'name'], name='host_status_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='host',
+            index=models.Index(fields=['name'], name='host_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='host',
+            index=models.Index(fields=['last_password_change'], name='host_pwd_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='host',
+            index=models.Index(fields=['updated_at'], name='host_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:44
+
+import hosts.models
+from django.db import migrations, models
+from hosts.network import ip_to_key
+
+
+def populate_ip_key(apps, schema_editor):
+    Host = apps.get_model('hosts', 'Host')
+    db_alias = schema_editor.connection.alias
+    batch = []
+    for host in Host.objects.using(db_alias).only('id', 'ip_address').iterator(chunk_size=2000):
+        host.ip_key = ip_to_key(host.ip_address)
+        batch.append(host)
+        if len(batch) >= 2000:
+            Host.objects.using(db_alias).bulk_update(batch, ['ip_key'])
+            batch = []
+    Host.objects.using(db_alias).bulk_update(batch, ['ip_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0007_host_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='host',
+            name='ip_key',
+            field=hosts.models.IPKeyField(blank=True, db_index=True, default='', verbose_name='IP排序键'),
+        ),
+        migrations.RunPython(populate_ip_key, migrations.RunPython.noop, hints={'model_name': 'host'}),
+        migrations.AddIndex(
+            model_name='host',
+            index=models.Index(fields=['datacenter', 'ip_key'], name='host_dc_ip_key_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0008_host_ip_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pingsweep',
+            name='cidr',
+            field=models.CharField(blank=True, default='', max_length=50, verbose_name='网段'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0009_pingsweep_cidr'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='host',
+            name='flap_score',
+            field=models.FloatField(default=0, verbose_name='状态抖动分数'),
+        ),
+        migrations.AddField(
+            model_name='host',
+            name='last_probe_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='最近探测时间'),
+        ),
+        migrations.AddField(
+            model_name='host',
+            name='next_probe_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='下次探测时间'),
+        ),
+        migrations.AddField(
+            model_name='host',
+            name='probe_failures',
+            field=models.IntegerField(default=0, verbose_name='连续探测失败次数'),
+        ),
+        migrations.AddField(
+            model_name='host',
+            name='probe_successes',
+            field=models.IntegerField(default=0, verbose_name='连续探测成功次数'),
+        ),
+        migrations.AddIndex(
+            model_name='host',
+            index=models.Index(fields=['next_probe_at', 'status'], name='host_probe_due_idx'),
+        ),
+    ]
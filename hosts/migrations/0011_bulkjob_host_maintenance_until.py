@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0010_host_probe_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('set_status', '修改状态'), ('maintenance', '维护窗口'), ('rotate_passwords', '轮换密码')], max_length=20, verbose_name='操作')),
+                ('target', models.JSONField(default=dict, verbose_name='目标主机条件')),
+                ('params', models.JSONField(default=dict, verbose_name='操作参数')),
+                ('status', models.CharField(choices=[('pending', '等待中'), ('running', '执行中'), ('success', '成功'), ('failed', '失败')], default='pending', max_length=20, verbose_name='状态')),
+                ('total', models.IntegerField(default=0, verbose_name='目标主机数')),
+                ('processed', models.IntegerField(default=0, verbose_name='已处理主机数')),
+                ('last_host_id', models.BigIntegerField(default=0, verbose_name='已处理的最大主机ID')),
+                ('error_message', models.TextField(blank=True, verbose_name='错误信息')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='完成时间')),
+            ],
+            options={
+                'verbose_name': '批量操作',
+                'verbose_name_plural': '批量操作',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='host',
+            name='maintenance_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='维护截止时间'),
+        ),
+        migrations.AddIndex(
+            model_name='host',
+            index=models.Index(fields=['maintenance_until'], name='host_maint_until_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0011_bulkjob_host_maintenance_until'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CredentialAccessLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('host_id', models.BigIntegerField(verbose_name='主机ID')),
+                ('ip_address', models.GenericIPAddressField(verbose_name='主机IP地址')),
+                ('user', models.CharField(max_length=150, verbose_name='访问者')),
+                ('source', models.CharField(choices=[('api', '接口'), ('command', '命令行')], max_length=20, verbose_name='来源')),
+                ('remote_addr', models.GenericIPAddressField(blank=True, null=True, verbose_name='客户端IP地址')),
+                ('accessed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='访问时间')),
+            ],
+            options={
+                'verbose_name': '密码访问记录',
+                'verbose_name_plural': '密码访问记录',
+                'ordering': ['-accessed_at'],
+                'indexes': [models.Index(fields=['host_id', 'accessed_at'], name='cred_log_host_idx'), models.Index(fields=['user', 'accessed_at'], name='cred_log_user_idx')],
+            },
+        ),
+    ]
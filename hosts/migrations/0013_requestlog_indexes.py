@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0012_credentialaccesslog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='requestlog',
+            index=models.Index(fields=['created_at'], name='requestlog_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestlog',
+            index=models.Index(fields=['status_code', 'created_at'], name='requestlog_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0013_requestlog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskrun',
+            name='checkpoint',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='断点（已处理的最大主键）'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_pattern_index(apps, schema_editor):
+    # 只在 PostgreSQL 上创建：非C排序规则下普通B树索引不能用于 LIKE 'x%'，
+    # 其他数据库已有 host_name_idx，再建一个同列索引没有意义
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS host_name_pattern_idx ON hosts_host (name varchar_pattern_ops)'
+    )
+
+
+def drop_pattern_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS host_name_pattern_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0014_taskrun_checkpoint'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_pattern_index, drop_pattern_index, hints={'model_name': 'host'}),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hosts', '0015_host_name_pattern_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='credentialaccesslog',
+            name='decrypt_failed',
+            field=models.BooleanField(default=False, verbose_name='解密失败'),
+        ),
+    ]
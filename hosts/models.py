@@ -1,8 +1,33 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.utils import timezone
-from cryptography.fernet import Fernet
-from django.conf import settings
-import base64
+from .crypto import decrypt_password, encrypt_password
+from .network import cidr_to_key_range, ip_to_key
+
+
+class IPKeyField(models.CharField):
+    """由IP地址字段计算出的可排序十六进制键（见 hosts.network），保存和 bulk_create 时自动同步
+
+    save(update_fields=...)、QuerySet.update() 和 bulk_update() 修改IP地址时由 Host/HostQuerySet 一并更新。
+    """
+
+    def __init__(self, *args, source='ip_address', **kwargs):
+        kwargs['max_length'] = 32
+        kwargs['editable'] = False
+        self.source = source
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs.pop('max_length', None)
+        kwargs.pop('editable', None)
+        if self.source != 'ip_address':
+            kwargs['source'] = self.source
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = ip_to_key(getattr(model_instance, self.source))
+        setattr(model_instance, self.attname, value)
+        return value
 
 
 class City(models.Model):
@@ -39,6 +64,45 @@ class DataCenter(models.Model):
         return f"{self.city.name}-{self.name}"
 
 
+class HostQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        """修改IP地址时同步更新 ip_key；IP地址只能更新为固定值，不能使用表达式"""
+        if 'ip_address' in kwargs and 'ip_key' not in kwargs:
+            ip_address = kwargs['ip_address']
+            if not isinstance(ip_address, str):
+                raise ValueError('批量修改 ip_address 时必须为固定的IP地址，无法同步计算 ip_key')
+            kwargs['ip_key'] = ip_to_key(ip_address)
+        return super().update(**kwargs)
+
+    update.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        """修改IP地址时同步更新 ip_key"""
+        if 'ip_address' in fields and 'ip_key' not in fields:
+            objs = list(objs)
+            for obj in objs:
+                obj.ip_key = ip_to_key(obj.ip_address)
+            fields = [*fields, 'ip_key']
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+    bulk_update.alters_data = True
+
+    def in_cidr(self, cidr):
+        """网段内的主机，转换为 ip_key 上的范围查询；网段格式错误时抛出 ValueError"""
+        low, high = cidr_to_key_range(cidr)
+        return self.filter(ip_key__gte=low, ip_key__lte=high)
+
+    def due_for_probe(self, now=None):
+        """探测时间已到期的主机（维护中的主机除外），最早到期的排在前面"""
+        # 用不等条件而非 status IN (...)，让查询按 next_probe_at 范围走 host_probe_due_idx
+        return (
+            self.filter(next_probe_at__lte=now or timezone.now())
+            .exclude(status='maintenance')
+            .order_by('next_probe_at')
+        )
+
+
 class Host(models.Model):
     """主机模型"""
     STATUS_CHOICES = [
@@ -49,34 +113,60 @@ class Host(models.Model):
 
     name = models.CharField(max_length=100, verbose_name='主机名称')
     ip_address = models.GenericIPAddressField(unique=True, verbose_name='IP地址')
+    ip_key = IPKeyField(blank=True, default='', db_index=True, verbose_name='IP排序键')
     datacenter = models.ForeignKey(DataCenter, on_delete=models.CASCADE, related_name='hosts', verbose_name='所属机房')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active', verbose_name='状态')
     encrypted_root_password = models.TextField(verbose_name='加密的root密码')
     last_password_change = models.DateTimeField(auto_now_add=True, verbose_name='密码最后修改时间')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    # 自适应探测调度状态，见 hosts.scheduling
+    next_probe_at = models.DateTimeField(default=timezone.now, verbose_name='下次探测时间')
+    last_probe_at = models.DateTimeField(null=True, blank=True, verbose_name='最近探测时间')
+    probe_failures = models.IntegerField(default=0, verbose_name='连续探测失败次数')
+    probe_successes = models.IntegerField(default=0, verbose_name='连续探测成功次数')
+    flap_score = models.FloatField(default=0, verbose_name='状态抖动分数')
+    maintenance_until = models.DateTimeField(null=True, blank=True, verbose_name='维护截止时间')
+
+    objects = HostQuerySet.as_manager()
 
     class Meta:
         verbose_name = '主机'
         verbose_name_plural = '主机'
         ordering = ['datacenter', 'name']
+        # 支撑列表默认排序和 hosts.filters 中的各过滤条件
+        indexes = [
+            models.Index(fields=['datacenter', 'name'], name='host_dc_name_idx'),
+            models.Index(fields=['datacenter', 'status'], name='host_dc_status_idx'),
+            models.Index(fields=['status', 'name'], name='host_status_name_idx'),
+            models.Index(fields=['name'], name='host_name_idx'),
+            models.Index(fields=['last_password_change'], name='host_pwd_change_idx'),
+            models.Index(fields=['updated_at'], name='host_updated_idx'),
+            models.Index(fields=['datacenter', 'ip_key'], name='host_dc_ip_key_idx'),
+            # 探测调度的到期查询: next_probe_at <= now 按到期先后顺序扫描，状态条件在索引内判断
+            models.Index(fields=['next_probe_at', 'status'], name='host_probe_due_idx'),
+            # 到期维护窗口的自动解除
+            models.Index(fields=['maintenance_until'], name='host_maint_until_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.ip_address})"
 
+    def save(self, *args, update_fields=None, **kwargs):
+        # 只保存部分字段时，修改了IP地址也要同步 ip_key（由 IPKeyField.pre_save 计算）
+        if update_fields is not None and 'ip_address' in update_fields and 'ip_key' not in update_fields:
+            update_fields = [*update_fields, 'ip_key']
+        super().save(*args, update_fields=update_fields, **kwargs)
+
     def set_root_password(self, password):
         """加密并设置root密码"""
-        fernet = Fernet(settings.ENCRYPTION_KEY)
-        encrypted_password = fernet.encrypt(password.encode())
-        self.encrypted_root_password = base64.b64encode(encrypted_password).decode()
+        self.encrypted_root_password = encrypt_password(password)
         self.last_password_change = timezone.now()
         self.save()
 
     def get_root_password(self):
         """解密获取root密码"""
-        fernet = Fernet(settings.ENCRYPTION_KEY)
-        encrypted_password = base64.b64decode(self.encrypted_root_password.encode())
-        return fernet.decrypt(encrypted_password).decode()
+        return decrypt_password(self.encrypted_root_password)
 
 
 class HostStatistics(models.Model):
@@ -108,12 +198,245 @@ class RequestLog(models.Model):
     status_code = models.IntegerField(verbose_name='状态码')
     user_agent = models.TextField(blank=True, verbose_name='用户代理')
     ip_address = models.GenericIPAddressField(verbose_name='IP地址')
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name='请求时间')
+    query_count = models.IntegerField(default=0, verbose_name='SQL条数')
+    sql_time = models.FloatField(default=0, verbose_name='SQL耗时(毫秒)')
+    slowest_query = models.TextField(blank=True, verbose_name='最慢SQL')
+    over_query_budget = models.BooleanField(default=False, verbose_name='超出SQL预算')
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='请求时间')
 
     class Meta:
         verbose_name = '请求日志'
         verbose_name_plural = '请求日志'
         ordering = ['-created_at']
+        # 支撑管理后台按时间钻取和按状态码过滤后的时间倒序列表
+        indexes = [
+            models.Index(fields=['created_at'], name='requestlog_created_idx'),
+            models.Index(fields=['status_code', 'created_at'], name='requestlog_status_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.method} {self.path} - {self.response_time}ms"
+
+
+class PingSweep(models.Model):
+    """分片ping巡检任务"""
+    STRATEGY_CHOICES = [
+        ('datacenter', '按机房分片'),
+        ('hash', '按ID哈希分片'),
+    ]
+    STATUS_CHOICES = [
+        ('running', '执行中'),
+        ('success', '成功'),
+        ('failed', '部分失败'),
+    ]
+
+    strategy = models.CharField(max_length=20, choices=STRATEGY_CHOICES, default='datacenter', verbose_name='分片策略')
+    shard_count = models.IntegerField(default=0, verbose_name='分片数')
+    cidr = models.CharField(max_length=50, blank=True, default='', verbose_name='网段')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running', verbose_name='状态')
+    completed_shards = models.IntegerField(default=0, verbose_name='已完成分片数')
+    failed_shards = models.IntegerField(default=0, verbose_name='失败分片数')
+    total_hosts = models.IntegerField(default=0, verbose_name='已探测主机数')
+    reachable_hosts = models.IntegerField(default=0, verbose_name='可达主机数')
+    unreachable_hosts = models.IntegerField(default=0, verbose_name='不可达主机数')
+    changed_hosts = models.IntegerField(default=0, verbose_name='状态变更主机数')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+
+    class Meta:
+        verbose_name = 'ping巡检'
+        verbose_name_plural = 'ping巡检'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"ping巡检 #{self.pk} ({self.get_status_display()})"
+
+    def refresh_progress(self):
+        """根据各分片结果汇总巡检进度
+
+        先锁定巡检行再汇总：多个分片同时完成时依次执行，后提交的汇总不会覆盖先完成分片的结果。
+        """
+        with transaction.atomic(using=router.db_for_write(PingSweep)):
+            PingSweep.objects.select_for_update().only('pk').get(pk=self.pk)
+            shards = self.shards.all()
+            totals = shards.aggregate(
+                total_hosts=models.Sum('host_count'),
+                reachable_hosts=models.Sum('reachable_count'),
+                unreachable_hosts=models.Sum('unreachable_count'),
+                changed_hosts=models.Sum('changed_count'),
+                completed_shards=models.Count('id', filter=models.Q(status='success')),
+                failed_shards=models.Count('id', filter=models.Q(status='failed')),
+            )
+            for field, value in totals.items():
+                setattr(self, field, value or 0)
+
+            if self.completed_shards + self.failed_shards < self.shard_count:
+                self.status = 'running'
+                self.finished_at = None
+            else:
+                self.status = 'failed' if self.failed_shards else 'success'
+                self.finished_at = timezone.now()
+            self.save(update_fields=['status', 'finished_at', *totals])
+
+
+class PingSweepShard(models.Model):
+    """ping巡检分片"""
+    STATUS_CHOICES = [
+        ('pending', '等待中'),
+        ('running', '执行中'),
+        ('success', '成功'),
+        ('failed', '失败'),
+    ]
+
+    sweep = models.ForeignKey(PingSweep, on_delete=models.CASCADE, related_name='shards', verbose_name='所属巡检')
+    shard_key = models.CharField(max_length=50, verbose_name='分片键')
+    queue = models.CharField(max_length=100, blank=True, verbose_name='执行队列')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='状态')
+    attempts = models.IntegerField(default=0, verbose_name='执行次数')
+    host_count = models.IntegerField(default=0, verbose_name='主机数')
+    reachable_count = models.IntegerField(default=0, verbose_name='可达数')
+    unreachable_count = models.IntegerField(default=0, verbose_name='不可达数')
+    changed_count = models.IntegerField(default=0, verbose_name='状态变更数')
+    error_message = models.TextField(blank=True, verbose_name='错误信息')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='开始时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+
+    class Meta:
+        verbose_name = 'ping巡检分片'
+        verbose_name_plural = 'ping巡检分片'
+        unique_together = ['sweep', 'shard_key']
+        ordering = ['sweep', 'shard_key']
+
+    def __str__(self):
+        return f"{self.sweep_id}/{self.shard_key} ({self.get_status_display()})"
+
+
+class TaskLock(models.Model):
+    """定时任务锁（数据库锁实现，见 hosts.locks）"""
+    name = models.CharField(max_length=200, unique=True, verbose_name='锁名称')
+    token = models.CharField(max_length=64, verbose_name='持有者标识')
+    expires_at = models.DateTimeField(verbose_name='过期时间')
+    pending = models.BooleanField(default=False, verbose_name='有被合并的执行')
+
+    class Meta:
+        verbose_name = '任务锁'
+        verbose_name_plural = '任务锁'
+
+    def __str__(self):
+        return self.name
+
+
+class TaskRun(models.Model):
+    """定时任务执行记录"""
+    STATUS_CHOICES = [
+        ('running', '执行中'),
+        ('success', '成功'),
+        ('failed', '失败'),
+        ('skipped', '已跳过'),
+    ]
+
+    task_name = models.CharField(max_length=200, verbose_name='任务名称')
+    task_id = models.CharField(max_length=100, blank=True, verbose_name='Celery任务ID')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running', verbose_name='状态')
+    published_at = models.DateTimeField(null=True, blank=True, verbose_name='投递时间')
+    started_at = models.DateTimeField(verbose_name='开始时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='结束时间')
+    duration = models.FloatField(null=True, blank=True, verbose_name='耗时(秒)')
+    lag = models.FloatField(null=True, blank=True, verbose_name='排队延迟(秒)')
+    item_count = models.IntegerField(null=True, blank=True, verbose_name='处理条目数')
+    cpu_time = models.FloatField(null=True, blank=True, verbose_name='CPU时间(秒)')
+    query_count = models.IntegerField(null=True, blank=True, verbose_name='SQL条数')
+    query_time = models.FloatField(null=True, blank=True, verbose_name='SQL耗时(秒)')
+    profile_path = models.CharField(max_length=500, blank=True, verbose_name='性能剖析文件')
+    checkpoint = models.BigIntegerField(null=True, blank=True, verbose_name='断点（已处理的最大主键）')
+    error_message = models.TextField(blank=True, verbose_name='错误信息')
+
+    class Meta:
+        verbose_name = '任务执行记录'
+        verbose_name_plural = '任务执行记录'
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['task_name', 'started_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.task_name} @ {self.started_at} ({self.get_status_display()})"
+
+    @property
+    def throughput(self):
+        """每秒处理条目数"""
+        if not self.item_count or not self.duration:
+            return None
+        return self.item_count / self.duration
+
+
+class BulkJob(models.Model):
+    """主机批量操作任务"""
+    ACTION_CHOICES = [
+        ('set_status', '修改状态'),
+        ('maintenance', '维护窗口'),
+        ('rotate_passwords', '轮换密码'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', '等待中'),
+        ('running', '执行中'),
+        ('success', '成功'),
+        ('failed', '失败'),
+    ]
+
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES, verbose_name='操作')
+    target = models.JSONField(default=dict, verbose_name='目标主机条件')
+    params = models.JSONField(default=dict, verbose_name='操作参数')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='状态')
+    total = models.IntegerField(default=0, verbose_name='目标主机数')
+    processed = models.IntegerField(default=0, verbose_name='已处理主机数')
+    last_host_id = models.BigIntegerField(default=0, verbose_name='已处理的最大主机ID')
+    error_message = models.TextField(blank=True, verbose_name='错误信息')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='开始时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
+
+    class Meta:
+        verbose_name = '批量操作'
+        verbose_name_plural = '批量操作'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_action_display()} #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def progress(self):
+        """完成百分比"""
+        if self.status == 'success':
+            return 100.0
+        if not self.total:
+            return 0.0
+        return round(min(self.processed / self.total, 1) * 100, 2)
+
+
+class CredentialAccessLog(models.Model):
+    """root密码读取审计记录（可能位于独立的指标库，主机用ID关联）"""
+    SOURCE_CHOICES = [
+        ('api', '接口'),
+        ('command', '命令行'),
+    ]
+
+    host_id = models.BigIntegerField(verbose_name='主机ID')
+    ip_address = models.GenericIPAddressField(verbose_name='主机IP地址')
+    user = models.CharField(max_length=150, verbose_name='访问者')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, verbose_name='来源')
+    remote_addr = models.GenericIPAddressField(null=True, blank=True, verbose_name='客户端IP地址')
+    decrypt_failed = models.BooleanField(default=False, verbose_name='解密失败')
+    accessed_at = models.DateTimeField(default=timezone.now, verbose_name='访问时间')
+
+    class Meta:
+        verbose_name = '密码访问记录'
+        verbose_name_plural = '密码访问记录'
+        ordering = ['-accessed_at']
+        indexes = [
+            models.Index(fields=['host_id', 'accessed_at'], name='cred_log_host_idx'),
+            models.Index(fields=['user', 'accessed_at'], name='cred_log_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} -> {self.ip_address} @ {self.accessed_at}"
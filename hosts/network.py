@@ -0,0 +1,57 @@
+"""
+IP地址的可排序数值键
+
+IPv4 按 IPv4 映射地址（::ffff:a.b.c.d）转换为128位整数，与IPv6统一编码为32位十六进制字符串。
+该字符串的字典序即数值序，CIDR 网段对应一段连续的键区间，可以直接走索引做范围查询。
+"""
+
+import ipaddress
+
+KEY_LENGTH = 32
+
+_IPV4_MAPPED_PREFIX = 0xffff << 32
+
+
+def _to_int(ip):
+    if ip.version == 4:
+        return _IPV4_MAPPED_PREFIX | int(ip)
+    return int(ip)
+
+
+def ip_to_key(ip_address):
+    """把IP地址转换为定长十六进制键，空值返回空字符串"""
+    if not ip_address:
+        return ''
+    return f'{_to_int(ipaddress.ip_address(ip_address)):0{KEY_LENGTH}x}'
+
+
+def key_to_ip(key):
+    """ip_to_key 的逆运算"""
+    value = int(key, 16)
+    if value >> 32 == 0xffff:
+        return str(ipaddress.IPv4Address(value & 0xffffffff))
+    return str(ipaddress.IPv6Address(value))
+
+
+def cidr_to_key_range(cidr):
+    """把CIDR网段转换为闭区间 (起始键, 结束键)，格式错误时抛出 ValueError"""
+    network = ipaddress.ip_network(cidr, strict=False)
+    return (
+        f'{_to_int(network.network_address):0{KEY_LENGTH}x}',
+        f'{_to_int(network.broadcast_address):0{KEY_LENGTH}x}',
+    )
+
+
+def key_network(key, prefix_v4=24, prefix_v6=64):
+    """返回键所在的网段（IPv4 按 prefix_v4，IPv6 按 prefix_v6 划分）"""
+    return ipaddress.ip_network(
+        f'{key_to_ip(key)}/{prefix_v4 if int(key, 16) >> 32 == 0xffff else prefix_v6}',
+        strict=False,
+    )
+
+
+def network_capacity(network):
+    """网段中可分配给主机的地址数（IPv4 /30 及更大网段扣除网络地址和广播地址）"""
+    if network.version == 4 and network.prefixlen <= 30:
+        return network.num_addresses - 2
+    return network.num_addresses
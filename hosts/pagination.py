@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+
+
+class StandardPagination(PageNumberPagination):
+    """默认分页，支持通过 page_size 参数调整每页条数"""
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+def estimated_row_count(model, using):
+    """从数据库统计信息读取表的估算行数，不支持或没有统计信息时返回 None
+
+    目前只支持 PostgreSQL（pg_class.reltuples，由 ANALYZE/autovacuum 维护）。
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+        row = cursor.fetchone()
+    # 从未 ANALYZE 过的表 reltuples 为 -1
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """大表分页器，避免对整表执行精确的 COUNT(*)
+
+    - 无过滤条件且数据库有统计信息（PostgreSQL）时，使用估算行数；
+    - 其余情况只数到 ADMIN_COUNT_CAP 条（COUNT 包在 LIMIT 子查询中），超出部分不再分页。
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+
+        cap = getattr(settings, 'ADMIN_COUNT_CAP', 10000)
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= cap:
+                return estimate
+        return queryset.order_by()[:cap].count()
@@ -0,0 +1,58 @@
+import platform
+import subprocess
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def ping_host(ip_address, timeout=5):
+    """执行一次ping，返回与 PingResponseSerializer 一致的字典
+
+    命令超时时抛出 subprocess.TimeoutExpired，由调用方处理。
+    """
+    is_windows = platform.system().lower() == "windows"
+
+    # 根据操作系统选择ping命令
+    if is_windows:
+        ping_cmd = ["ping", "-n", "1", "-w", "1000", ip_address]
+    else:
+        ping_cmd = ["ping", "-c", "1", "-W", "1", ip_address]
+
+    # 执行ping命令
+    result = subprocess.run(
+        ping_cmd,
+        capture_output=True,
+        text=True,
+        timeout=timeout
+    )
+
+    is_reachable = result.returncode == 0
+    response_data = {
+        'ip_address': ip_address,
+        'is_reachable': is_reachable,
+    }
+
+    if is_reachable:
+        # 提取响应时间（如果可能）
+        try:
+            for line in result.stdout.split('\n'):
+                if is_windows and ('时间=' in line or 'time=' in line):
+                    # Windows ping输出解析
+                    time_str = line.split('时间=')[-1].split('ms')[0] if '时间=' in line else line.split('time=')[-1].split('ms')[0]
+                    response_data['response_time'] = float(time_str)
+                    break
+                if not is_windows and 'time=' in line:
+                    # Linux/Unix ping输出解析
+                    time_str = line.split('time=')[-1].split(' ')[0]
+                    response_data['response_time'] = float(time_str)
+                    break
+        except ValueError:
+            pass
+    else:
+        response_data['error_message'] = result.stderr or '主机不可达'
+
+    return response_data
+
+
+def get_prober():
+    """返回配置的探测函数（settings.HOST_PROBER），签名同 ping_host"""
+    return import_string(getattr(settings, 'HOST_PROBER', 'hosts.ping.ping_host'))
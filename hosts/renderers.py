@@ -0,0 +1,60 @@
+"""
+高性能JSON渲染/解析
+
+安装 orjson 时使用 orjson 编解码，否则回退到DRF自带的标准库实现。
+输出与 JSONRenderer 保持一致：日期时间等类型仍交由DRF的 JSONEncoder 处理；
+只有科学计数法的浮点数写法不同（如 1e-5 与 1e-05），解析结果相同。
+"""
+
+import json
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+_encoder = JSONEncoder()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """基于 orjson 的JSON渲染器，需要缩进输出或未安装 orjson 时回退到 JSONRenderer"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=_encoder.default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        # 与 JSONRenderer 一致，转义 \u2028 和 \u2029
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
+
+
+def ndjson_line(data):
+    """把一条记录编码为 NDJSON 的一行（bytes，以换行结尾）"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(data, cls=JSONEncoder, ensure_ascii=False) + '\n').encode()
+
+
+class FastJSONParser(JSONParser):
+    """基于 orjson 的JSON解析器，未安装 orjson 时回退到 JSONParser"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,88 @@
+"""
+主机自适应探测调度
+
+每台主机保存下一次探测时间 next_probe_at，由 probe_due_hosts 定时任务按
+"到期时间早于当前时间" 的索引查询取出到期主机：
+
+- 连续探测成功的稳定主机逐步退避，间隔从 PROBE_MIN_INTERVAL 倍增到 PROBE_MAX_INTERVAL；
+- 最近探测失败的主机按 PROBE_MIN_INTERVAL 复查，连续失败后缓慢退避到 PROBE_FAILED_MAX_INTERVAL；
+- 状态频繁翻转（抖动）的主机始终按 PROBE_MIN_INTERVAL 探测；
+- 维护中的主机不参与调度。
+
+随机抖动只缩短间隔，任何主机的探测间隔都不超过对应的上限。
+"""
+
+import random
+from datetime import timedelta
+from django.conf import settings
+
+# probe_due_hosts 探测后需要写回的字段
+SCHEDULE_FIELDS = [
+    'status', 'next_probe_at', 'last_probe_at', 'probe_failures',
+    'probe_successes', 'flap_score', 'updated_at',
+]
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def is_flapping(host):
+    return host.flap_score >= _setting('PROBE_FLAP_THRESHOLD', 3.0)
+
+
+def next_interval(host):
+    """根据主机最近的探测结果计算下一次探测间隔（秒）"""
+    min_interval = _setting('PROBE_MIN_INTERVAL', 60)
+    if is_flapping(host):
+        return min_interval
+    if host.probe_failures:
+        # 前几次失败紧密复查，之后按失败次数倍增
+        backoff = 2 ** max(host.probe_failures - 3, 0)
+        return min(min_interval * backoff, _setting('PROBE_FAILED_MAX_INTERVAL', 900))
+    return min(min_interval * 2 ** host.probe_successes, _setting('PROBE_MAX_INTERVAL', 7200))
+
+
+def schedule_next_probe(host, now):
+    """设置 next_probe_at，加入随机抖动避免大量主机在同一时刻到期
+
+    抖动只向下（最多缩短 PROBE_JITTER 比例），退避到上限的主机不会超过上限才探测。
+    """
+    interval = next_interval(host)
+    jitter = _setting('PROBE_JITTER', 0.1)
+    interval *= 1 - random.uniform(0, jitter)
+    host.next_probe_at = now + timedelta(seconds=interval)
+
+
+def record_probe(host, is_reachable, now):
+    """记录一次探测结果并更新主机状态与下一次探测时间（不保存），返回状态是否发生变化
+
+    is_reachable 为 None 表示探测本身出错，不改变主机状态，按最短间隔重试。
+    """
+    host.last_probe_at = now
+    changed = False
+
+    if is_reachable is None:
+        host.next_probe_at = now + timedelta(seconds=_setting('PROBE_MIN_INTERVAL', 60))
+        return changed
+
+    # 抖动分数：每次探测衰减，每次状态翻转加1
+    host.flap_score *= _setting('PROBE_FLAP_DECAY', 0.8)
+    if is_reachable:
+        host.probe_failures = 0
+        host.probe_successes += 1
+        if host.status == 'inactive':
+            host.status = 'active'
+            changed = True
+    else:
+        host.probe_successes = 0
+        host.probe_failures += 1
+        if host.status == 'active':
+            host.status = 'inactive'
+            changed = True
+
+    if changed:
+        host.flap_score += 1
+        host.updated_at = now
+    schedule_next_probe(host, now)
+    return changed
@@ -1,5 +1,11 @@
+from datetime import timedelta
+from functools import lru_cache
+from django.utils import timezone
 from rest_framework import serializers
-from .models import City, DataCenter, Host, HostStatistics, RequestLog
+from .models import (
+    BulkJob, City, DataCenter, Host, HostStatistics, RequestLog, PingSweep, PingSweepShard, TaskRun
+)
+from .network import cidr_to_key_range
 
 
 class CitySerializer(serializers.ModelSerializer):
@@ -27,7 +33,10 @@ class HostSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Host
-        fields = '__all__'
+        # ip_key 是 ip_address 的派生排序键，不对外暴露
+        exclude = ['ip_key']
+        # 探测调度状态由 probe_due_hosts 维护
+        read_only_fields = ['next_probe_at', 'last_probe_at', 'probe_failures', 'probe_successes', 'flap_score']
         extra_kwargs = {
             'encrypted_root_password': {'read_only': True},
             'last_password_change': {'read_only': True},
@@ -73,4 +82,151 @@ class PingResponseSerializer(serializers.Serializer):
     ip_address = serializers.CharField()
     is_reachable = serializers.BooleanField()
     response_time = serializers.FloatField(required=False)
-    error_message = serializers.CharField(required=False) 
\ No newline at end of file
+    error_message = serializers.CharField(required=False) 
+
+class PingSweepShardSerializer(serializers.ModelSerializer):
+    """ping巡检分片序列化器"""
+    
+    class Meta:
+        model = PingSweepShard
+        exclude = ['sweep']
+
+
+class PingSweepSerializer(serializers.ModelSerializer):
+    """ping巡检序列化器"""
+    shards = PingSweepShardSerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = PingSweep
+        fields = '__all__'
+
+
+class TaskRunSerializer(serializers.ModelSerializer):
+    """任务执行记录序列化器"""
+    throughput = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = TaskRun
+        fields = '__all__'
+
+
+class BulkJobSerializer(serializers.ModelSerializer):
+    """批量操作任务序列化器"""
+    progress = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = BulkJob
+        exclude = ['last_host_id']
+
+
+class BulkTargetSerializer(serializers.Serializer):
+    """批量操作的目标主机条件，多个条件取交集"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=10000,
+    )
+    datacenter_id = serializers.IntegerField(required=False, min_value=1)
+    city_id = serializers.IntegerField(required=False, min_value=1)
+    cidr = serializers.CharField(required=False)
+    
+    def validate_cidr(self, value):
+        try:
+            cidr_to_key_range(value)
+        except ValueError:
+            raise serializers.ValidationError('网段格式错误，应为CIDR格式，如 10.0.0.0/16')
+        return value
+    
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError('至少指定 ids、datacenter_id、city_id、cidr 中的一个条件')
+        return attrs
+
+
+class BulkActionSerializer(serializers.Serializer):
+    """批量操作请求
+
+    - set_status: 需要 status
+    - maintenance: 需要 until（截止时间）或 duration_minutes（维护时长）
+    - rotate_passwords: 无参数
+    """
+    action = serializers.ChoiceField(choices=BulkJob.ACTION_CHOICES)
+    target = BulkTargetSerializer()
+    status = serializers.ChoiceField(choices=Host.STATUS_CHOICES, required=False)
+    until = serializers.DateTimeField(required=False)
+    duration_minutes = serializers.IntegerField(required=False, min_value=1)
+    
+    def validate(self, attrs):
+        action = attrs['action']
+        params = {}
+        if action == 'set_status':
+            if 'status' not in attrs:
+                raise serializers.ValidationError({'status': '修改状态时必须指定 status'})
+            params['status'] = attrs['status']
+        elif action == 'maintenance':
+            until = attrs.get('until')
+            if until is None and 'duration_minutes' in attrs:
+                until = timezone.now() + timedelta(minutes=attrs['duration_minutes'])
+            if until is None:
+                raise serializers.ValidationError({'until': '维护窗口必须指定 until 或 duration_minutes'})
+            if until <= timezone.now():
+                raise serializers.ValidationError({'until': '维护截止时间必须晚于当前时间'})
+            params['until'] = until.isoformat()
+        return {'action': action, 'target': attrs['target'], 'params': params}
+
+
+class ValuesRowBuilder:
+    """根据序列化器的可读字段，从 QuerySet.values() 的结果直接构造输出行
+
+    输出的键、顺序和取值与序列化器一致，但不再逐对象实例化字段，用于只读列表接口。
+    只支持 source 为模型字段或关联路径（如 datacenter.city.name）的字段。
+    """
+
+    # 需要经过字段 to_representation 转换的类型，其余类型 .values() 的取值即为输出值
+    CONVERTED_FIELDS = (
+        serializers.DateTimeField, serializers.DateField, serializers.TimeField,
+        serializers.DecimalField, serializers.DurationField,
+    )
+
+    def __init__(self, serializer_class):
+        self.columns = []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or isinstance(field, serializers.BaseSerializer):
+                raise ValueError(f'{serializer_class.__name__}.{name} 不支持 values() 输出')
+            convert = field.to_representation if isinstance(field, self.CONVERTED_FIELDS) else None
+            self.columns.append((name, field.source.replace('.', '__'), convert))
+
+    @property
+    def field_names(self):
+        return [name for name, _, _ in self.columns]
+
+    def select(self, fields=None):
+        """按字段名列表（稀疏字段集）选取列，未知字段抛出 ValidationError"""
+        if not fields:
+            return self.columns
+        unknown = set(fields) - set(self.field_names)
+        if unknown:
+            raise serializers.ValidationError({'fields': f'未知字段: {", ".join(sorted(unknown))}'})
+        return [column for column in self.columns if column[0] in fields]
+
+    @staticmethod
+    def lookups(columns):
+        """.values() 需要查询的列"""
+        return list(dict.fromkeys(lookup for _, lookup, _ in columns))
+
+    @staticmethod
+    def build(rows, columns):
+        """把 .values() 结果转换为输出行"""
+        return [
+            {
+                name: convert(row[lookup]) if convert is not None and row[lookup] is not None else row[lookup]
+                for name, lookup, convert in columns
+            }
+            for row in rows
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_row_builder(serializer_class):
+    """按序列化器类缓存 ValuesRowBuilder"""
+    return ValuesRowBuilder(serializer_class)
@@ -0,0 +1,188 @@
+"""
+定时任务执行跟踪
+
+exclusive_task 装饰器为任务加分布式锁，防止慢任务与下一次调度重叠执行；
+tracked_task 只做跟踪不加锁。两者都会把每次执行的耗时、CPU时间、SQL条数与耗时、
+处理条目数和排队延迟写入 TaskRun，并可按 TASK_PROFILE_TASKS 配置保存性能剖析文件。
+分块处理的任务通过 resume_checkpoint/save_checkpoint 记录断点，崩溃后下一次执行从断点继续；
+exclusive_task 的锁租约在每次 save_checkpoint 时续期，其他长时间执行的任务可调用 renew_lease。
+"""
+
+import contextvars
+import functools
+import os
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone as dt_timezone
+from celery import current_app, current_task
+from django.conf import settings
+from django.utils import timezone
+from .instrumentation import QueryStats, profile_to
+from .locks import LeaseLost, get_lock_backend, task_lock
+from .models import TaskRun
+
+
+# 当前正在执行的任务记录
+_current_run = contextvars.ContextVar('current_task_run', default=None)
+# 当前任务持有的锁租约（只有 exclusive_task 才有）
+_current_lease = contextvars.ContextVar('current_task_lease', default=None)
+
+
+def _published_at(request):
+    """发布时间由 host_management.celery 中的 before_task_publish 信号写入消息头"""
+    timestamp = getattr(request, 'published_at', None) if request else None
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+def _new_run(task_name):
+    request = current_task.request if current_task else None
+    started_at = timezone.now()
+    published_at = _published_at(request)
+    return TaskRun(
+        task_name=task_name,
+        task_id=(request.id if request else None) or '',
+        published_at=published_at,
+        started_at=started_at,
+        lag=(started_at - published_at).total_seconds() if published_at else None,
+    )
+
+
+def _profile_path(run):
+    directory = getattr(settings, 'TASK_PROFILE_DIR', 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{run.task_name}-{run.started_at:%Y%m%d%H%M%S}-{run.pk}')
+
+
+def _execute(run, func, args, kwargs):
+    """执行任务函数并把性能数据记录到 run"""
+    run.save()
+    token = _current_run.set(run)
+    queries = QueryStats()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        with ExitStack() as stack:
+            if run.task_name in getattr(settings, 'TASK_PROFILE_TASKS', ()):
+                run.profile_path = stack.enter_context(
+                    profile_to(_profile_path(run), getattr(settings, 'TASK_PROFILER', 'cprofile'))
+                )
+            stack.enter_context(queries)
+            result = func(*args, **kwargs)
+    except Exception as e:
+        run.status = 'failed'
+        run.error_message = str(e)
+        raise
+    else:
+        run.status = 'success'
+        if isinstance(result, int):
+            run.item_count = result
+        return result
+    finally:
+        _current_run.reset(token)
+        run.duration = time.perf_counter() - wall_start
+        run.cpu_time = time.process_time() - cpu_start
+        run.query_count = queries.count
+        run.query_time = queries.total_time
+        run.finished_at = timezone.now()
+        run.save()
+
+
+def resume_checkpoint(since):
+    """返回当前任务可以继续的断点（已处理的最大主键），没有时返回 0
+
+    只有同名任务在 since 之后开始、且未正常结束（失败或进程崩溃仍为执行中）的上一次执行才会被继续。
+    执行中的记录只有在持有任务锁时才能确定已经中断，因此只应在 exclusive_task 中使用；
+    since 与锁租约无关，租约应远短于 since 的窗口（崩溃后租约到期即可接管）。
+    """
+    run = _current_run.get()
+    if run is None or since is None:
+        return 0
+    previous = (
+        TaskRun.objects.filter(task_name=run.task_name, started_at__gte=since, started_at__lte=run.started_at)
+        .exclude(pk=run.pk)
+        .exclude(status='skipped')
+        .order_by('-started_at')
+        .first()
+    )
+    if previous is None or previous.status not in ('failed', 'running') or not previous.checkpoint:
+        return 0
+    if previous.status == 'running':
+        # 进程被强制终止的执行不会自己结束，接管时补记为失败
+        TaskRun.objects.filter(pk=previous.pk, status='running').update(
+            status='failed', error_message='执行中断（进程退出），已由后续执行从断点继续',
+        )
+    save_checkpoint(previous.checkpoint)
+    return previous.checkpoint
+
+
+def save_checkpoint(pk):
+    """记录当前任务已处理到的最大主键"""
+    run = _current_run.get()
+    if run is None:
+        return
+    run.checkpoint = pk
+    TaskRun.objects.filter(pk=run.pk).update(checkpoint=pk)
+    renew_lease()
+
+
+def renew_lease():
+    """续期当前任务的锁租约（不在 exclusive_task 中时什么也不做）
+
+    锁已过期并被其他实例获取时抛出 LeaseLost：继续执行就会与新的持有者重叠，
+    异常使本次执行记为失败并停止，已提交的块由断点记录，之后的执行可以继续。
+    """
+    lease = _current_lease.get()
+    if lease is not None and not lease.renew():
+        raise LeaseLost(f"任务 {lease.name} 的锁已过期并被其他实例获取，停止执行")
+
+
+def tracked_task(func):
+    """任务执行跟踪装饰器（置于 @shared_task 之下），不加锁"""
+    task_name = f'{func.__module__}.{func.__name__}'
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return _execute(_new_run(task_name), func, args, kwargs)
+    return wrapper
+
+
+def exclusive_task(lock_ttl, overlap='skip'):
+    """任务互斥执行装饰器（置于 @shared_task 之下）
+
+    overlap='skip': 已有实例在执行时直接跳过本次调度；
+    overlap='coalesce': 跳过本次调度，但在当前实例结束后补跑一次（多次重叠只补跑一次）。
+    lock_ttl 为锁租约时长（秒）：分块任务每处理完一块续期一次，租约只需覆盖一块的处理时间。
+    被装饰函数返回整数时记为处理条目数。
+    """
+    def decorator(func):
+        task_name = f'{func.__module__}.{func.__name__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            run = _new_run(task_name)
+            backend = get_lock_backend()
+            with task_lock(task_name, lock_ttl, backend=backend) as lease:
+                if not lease:
+                    if overlap == 'coalesce':
+                        backend.mark_pending(task_name)
+                    run.status = 'skipped'
+                    run.finished_at = timezone.now()
+                    run.duration = 0
+                    run.save()
+                    print(f"任务 {task_name} 已有实例在执行，本次调度已跳过")
+                    return None
+
+                token = _current_lease.set(lease)
+                try:
+                    result = _execute(run, func, args, kwargs)
+                finally:
+                    _current_lease.reset(token)
+
+            # 锁释放后若期间有被合并的调度，补跑一次
+            if overlap == 'coalesce' and backend.pop_pending(task_name):
+                current_app.send_task(task_name, args=args, kwargs=kwargs)
+            return result
+        return wrapper
+    return decorator
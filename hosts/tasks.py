@@ -1,111 +1,359 @@
-import random
-import string
+from concurrent.futures import ThreadPoolExecutor
 from celery import shared_task
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Mod
 from django.utils import timezone
-from datetime import date
-from .models import Host, HostStatistics, City, DataCenter
+from datetime import date, datetime, time, timedelta
+from .bulk import rotate_passwords, run_job, update_rows
+from .chunking import iter_chunks, run_in_chunks
+from .models import BulkJob, Host, HostStatistics, DataCenter, PingSweep, PingSweepShard
+from .ping import get_prober
+from .scheduling import SCHEDULE_FIELDS, is_flapping, record_probe
+from .task_runs import exclusive_task, tracked_task
+
+STATISTICS_FIELDS = ['total_hosts', 'active_hosts', 'inactive_hosts', 'maintenance_hosts']
+
+
+# 改密周期（小时），与 celery beat 的调度（0:00、8:00、16:00）一致
+PASSWORD_ROTATION_HOURS = 8
+
+
+def _rotation_slot_start(now):
+    """now 所在改密调度周期的开始时间（本地时间 0:00、8:00、16:00）"""
+    now = timezone.localtime(now)
+    return now.replace(hour=now.hour - now.hour % PASSWORD_ROTATION_HOURS, minute=0, second=0, microsecond=0)
 
 
 @shared_task
+@exclusive_task(lock_ttl=600)
 def change_host_passwords():
-    """每8小时修改所有主机的root密码"""
-    hosts = Host.objects.all()
-    
-    for host in hosts:
-        # 生成随机密码（12位，包含字母、数字和特殊字符）
-        password = ''.join(random.choices(
-            string.ascii_letters + string.digits + '!@#$%^&*',
-            k=12
-        ))
-        
-        # 设置新密码
-        host.set_root_password(password)
-        
-        print(f"已更新主机 {host.name} ({host.ip_address}) 的密码")
+    """每8小时修改所有主机的root密码，返回更新的主机数
+
+    按主键分块处理，中断后同一调度周期内的再次执行从断点继续，已更新的主机不会重复更新；
+    下一个周期的调度总是从头执行，断点之前的主机不会因续跑而跳过一个周期。
+    锁租约每块续期一次，worker 崩溃后10分钟内即可被手动执行接管。
+    """
+    def rotate(hosts):
+        # 每台主机生成新的随机密码并加密写入
+        rotate_passwords([host.pk for host in hosts])
+        for host in hosts:
+            print(f"已更新主机 {host.name} ({host.ip_address}) 的密码")
+        return len(hosts)
+
+    return run_in_chunks(
+        Host.objects.all(), rotate, fields=['name', 'ip_address'],
+        resume_since=_rotation_slot_start(timezone.now()),
+    )
 
 
 @shared_task
+@exclusive_task(lock_ttl=600)
 def generate_daily_statistics():
-    """每天00:00生成主机统计数据"""
+    """每天00:00生成主机统计数据，返回统计的机房数
+
+    按机房分块，每块用一条聚合查询统计各机房的主机状态、一条 upsert 写入；当天中断后再次执行从断点继续。
+    """
     today = date.today()
-    
-    # 获取所有城市和机房
-    cities = City.objects.all()
-    
-    for city in cities:
-        datacenters = city.datacenters.all()
-        
+
+    def summarize(datacenters):
+        counts = {
+            row['datacenter_id']: row
+            for row in Host.objects.filter(datacenter__in=datacenters).values('datacenter_id').annotate(
+                total_hosts=Count('id'),
+                active_hosts=Count('id', filter=Q(status='active')),
+                inactive_hosts=Count('id', filter=Q(status='inactive')),
+                maintenance_hosts=Count('id', filter=Q(status='maintenance')),
+            ).order_by()
+        }
+        statistics = []
         for datacenter in datacenters:
-            # 获取该机房的所有主机
-            hosts = datacenter.hosts.all()
-            
-            # 统计各状态的主机数量
-            total_hosts = hosts.count()
-            active_hosts = hosts.filter(status='active').count()
-            inactive_hosts = hosts.filter(status='inactive').count()
-            maintenance_hosts = hosts.filter(status='maintenance').count()
-            
-            # 创建或更新统计记录
-            statistics, created = HostStatistics.objects.get_or_create(
-                city=city,
-                datacenter=datacenter,
-                date=today,
-                defaults={
-                    'total_hosts': total_hosts,
-                    'active_hosts': active_hosts,
-                    'inactive_hosts': inactive_hosts,
-                    'maintenance_hosts': maintenance_hosts,
-                }
-            )
-            
-            if not created:
-                # 更新现有记录
-                statistics.total_hosts = total_hosts
-                statistics.active_hosts = active_hosts
-                statistics.inactive_hosts = inactive_hosts
-                statistics.maintenance_hosts = maintenance_hosts
-                statistics.save()
-            
-            print(f"已生成 {city.name}-{datacenter.name} 的统计数据: "
-                  f"总数={total_hosts}, 运行中={active_hosts}, "
-                  f"已停止={inactive_hosts}, 维护中={maintenance_hosts}")
+            row = counts.get(datacenter.pk, {})
+            values = {name: row.get(name, 0) for name in STATISTICS_FIELDS}
+            statistics.append(HostStatistics(city_id=datacenter.city_id, datacenter=datacenter, date=today, **values))
+            print(f"已生成 {datacenter.city.name}-{datacenter.name} 的统计数据: "
+                  f"总数={values['total_hosts']}, 运行中={values['active_hosts']}, "
+                  f"已停止={values['inactive_hosts']}, 维护中={values['maintenance_hosts']}")
+
+        # 整块一条 upsert：当天已有的统计记录（如重新执行）直接覆盖计数
+        HostStatistics.objects.bulk_create(
+            statistics, update_conflicts=True,
+            unique_fields=['city', 'datacenter', 'date'], update_fields=STATISTICS_FIELDS,
+        )
+        return len(datacenters)
+
+    today_start = timezone.make_aware(datetime.combine(today, time.min))
+    return run_in_chunks(
+        DataCenter.objects.select_related('city'), summarize,
+        fields=['name', 'city', 'city__name'], resume_since=today_start,
+    )
+
+
+# 探测需要加载的列：写回时只更新状态和调度字段
+PROBE_FIELDS = ['name', 'ip_address', 'datacenter', *SCHEDULE_FIELDS]
+
+
+def _probe_batch(hosts):
+    """用 PROBE_CONCURRENCY 个线程并发探测一组主机，记录结果并批量写回
+
+    返回各主机的探测结果（可达为 True、不可达为 False、探测出错为 None）和状态发生变化的主机数。
+    写回见 _save_probe_results：不覆盖其他字段，也不覆盖探测期间的人工修改。
+    """
+    probe = get_prober()
+
+    def run(host):
+        try:
+            return probe(host.ip_address)['is_reachable']
+        except Exception as e:
+            print(f"ping主机 {host.name} ({host.ip_address}) 时出错: {str(e)}")
+            return None
+
+    # 探测以等待网络为主，线程并发即可；探测函数不访问数据库
+    with ThreadPoolExecutor(max_workers=max(1, min(settings.PROBE_CONCURRENCY, len(hosts)))) as executor:
+        results = list(executor.map(run, hosts))
+
+    original_status = {host.pk: host.status for host in hosts}
+    now = timezone.now()
+    changed = 0
+    for host, is_reachable in zip(hosts, results):
+        if record_probe(host, is_reachable, now):
+            changed += 1
+            print(f"主机 {host.name} ({host.ip_address}) 状态已更新为{host.get_status_display()}")
+
+    _save_probe_results(hosts, original_status)
+    _expedite_datacenters(hosts, original_status, now)
+    return results, changed
+
+
+def _expedite_datacenters(hosts, original_status, now):
+    """稳定主机由可达变为不可达时，把同机房其他运行中主机的下次探测提前到现在
+
+    机房级故障通常同时影响多台主机，任一台被发现后同机房其余主机在下一次调度（1分钟内）即被探测，
+    不必等各自退避到上限的间隔。抖动主机的翻转不触发；已认领（next_probe_at 在认领超时内）
+    和刚探测过的主机不受影响。
+    """
+    datacenter_ids = {
+        host.datacenter_id for host in hosts
+        if original_status[host.pk] == 'active' and host.status == 'inactive' and not is_flapping(host)
+    }
+    if not datacenter_ids:
+        return 0
+    claimed_until = now + timedelta(seconds=settings.PROBE_CLAIM_TIMEOUT)
+    return Host.objects.filter(
+        datacenter_id__in=datacenter_ids, status='active', next_probe_at__gt=claimed_until,
+    ).update(next_probe_at=now)
 
 
 @shared_task
+@exclusive_task(lock_ttl=600, overlap='coalesce')
 def ping_all_hosts():
-    """批量ping所有主机检查可达性"""
-    import subprocess
-    import platform
-    
+    """批量ping所有主机检查可达性，返回探测的主机数
+
+    每块主机并发探测并批量写回（见 _probe_batch）。
+    """
+    def ping(hosts):
+        _probe_batch(hosts)
+        return len(hosts)
+
+    return run_in_chunks(
+        Host.objects.all(), ping, fields=PROBE_FIELDS,
+        resume_since=timezone.now() - timedelta(hours=1), atomic=False,
+    )
+
+
+def _shard_hosts(shard):
+    """返回分片对应的主机集合"""
     hosts = Host.objects.all()
-    
-    for host in hosts:
-        try:
-            # 根据操作系统选择ping命令
-            if platform.system().lower() == "windows":
-                ping_cmd = ["ping", "-n", "1", "-w", "1000", host.ip_address]
-            else:
-                ping_cmd = ["ping", "-c", "1", "-W", "1", host.ip_address]
-            
-            # 执行ping命令
-            result = subprocess.run(
-                ping_cmd,
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            is_reachable = result.returncode == 0
-            
-            # 更新主机状态（可选：根据ping结果更新状态）
-            if not is_reachable and host.status == 'active':
-                host.status = 'inactive'
-                host.save()
-                print(f"主机 {host.name} ({host.ip_address}) 不可达，状态已更新为已停止")
-            elif is_reachable and host.status == 'inactive':
-                host.status = 'active'
-                host.save()
-                print(f"主机 {host.name} ({host.ip_address}) 可达，状态已更新为运行中")
-                
-        except Exception as e:
-            print(f"ping主机 {host.name} ({host.ip_address}) 时出错: {str(e)}") 
\ No newline at end of file
+    if shard.sweep.cidr:
+        hosts = hosts.in_cidr(shard.sweep.cidr)
+    if shard.sweep.strategy == 'hash':
+        return hosts.annotate(shard=Mod('id', shard.sweep.shard_count)).filter(shard=int(shard.shard_key))
+    return hosts.filter(datacenter_id=int(shard.shard_key))
+
+
+def _dispatch_shard(shard):
+    options = {'queue': shard.queue} if shard.queue else {}
+    ping_sweep_shard.apply_async(args=[shard.pk], **options)
+
+
+@shared_task
+def start_ping_sweep(strategy=None, cidr=None):
+    """创建分片ping巡检并分发各分片任务，返回巡检ID
+
+    指定 cidr 时只巡检该网段内的主机。
+    """
+    strategy = strategy or settings.PING_SWEEP_STRATEGY
+    cidr = cidr or ''
+    queues = getattr(settings, 'PING_SWEEP_QUEUES', {})
+
+    hosts = Host.objects.in_cidr(cidr) if cidr else Host.objects.all()
+    if strategy == 'hash':
+        # 分片数随主机数增长，每个分片约 PING_SWEEP_SHARD_SIZE 台
+        shard_count = max(settings.PING_SWEEP_HASH_SHARDS, -(-hosts.count() // settings.PING_SWEEP_SHARD_SIZE))
+        shards = [(str(i), '') for i in range(shard_count)]
+    else:
+        datacenters = DataCenter.objects.filter(
+            id__in=hosts.values('datacenter_id')
+        ).values_list('id', 'code')
+        shards = [(str(dc_id), queues.get(code, '')) for dc_id, code in datacenters]
+
+    sweep = PingSweep.objects.create(strategy=strategy, shard_count=len(shards), cidr=cidr)
+    PingSweepShard.objects.bulk_create([
+        PingSweepShard(sweep=sweep, shard_key=key, queue=queue)
+        for key, queue in shards
+    ])
+    if not shards:
+        sweep.refresh_progress()
+
+    for shard in sweep.shards.all():
+        _dispatch_shard(shard)
+
+    print(f"已创建ping巡检 #{sweep.pk}，共 {len(shards)} 个分片")
+    return sweep.pk
+
+
+@shared_task
+@tracked_task
+def ping_sweep_shard(shard_id):
+    """执行单个巡检分片，可安全重复执行"""
+    shard = PingSweepShard.objects.select_related('sweep').get(pk=shard_id)
+    if shard.status == 'success':
+        return 0
+
+    shard.status = 'running'
+    shard.attempts += 1
+    shard.host_count = shard.reachable_count = shard.unreachable_count = shard.changed_count = 0
+    shard.error_message = ''
+    shard.started_at = timezone.now()
+    shard.finished_at = None
+    shard.save()
+
+    counters = ['host_count', 'reachable_count', 'unreachable_count', 'changed_count']
+    try:
+        # 按主键分块，每块并发探测、批量写回并更新分片进度
+        for hosts in iter_chunks(_shard_hosts(shard), PROBE_FIELDS):
+            results, changed = _probe_batch(hosts)
+            shard.host_count += len(hosts)
+            shard.reachable_count += results.count(True)
+            shard.unreachable_count += results.count(False)
+            shard.changed_count += changed
+            shard.save(update_fields=counters)
+        shard.status = 'success'
+    except Exception as e:
+        shard.status = 'failed'
+        shard.error_message = str(e)
+        print(f"ping巡检分片 {shard} 执行失败: {str(e)}")
+
+    shard.finished_at = timezone.now()
+    shard.save()
+    shard.sweep.refresh_progress()
+    return shard.host_count
+
+
+@shared_task
+def retry_ping_sweep(sweep_id, shard_ids=None):
+    """重新分发巡检中失败（或指定）的分片，返回重试的分片数"""
+    shards = PingSweepShard.objects.filter(sweep_id=sweep_id)
+    if shard_ids:
+        # 指定分片时也允许重试卡在执行中的分片（如worker崩溃）
+        shards = shards.filter(pk__in=shard_ids).exclude(status='success')
+    else:
+        shards = shards.filter(status='failed')
+    count = 0
+    for shard in shards:
+        _dispatch_shard(shard)
+        count += 1
+    return count
+
+
+def _dispatch_probe(host_ids):
+    probe_hosts.delay(host_ids)
+
+
+@shared_task
+@exclusive_task(lock_ttl=120)
+def probe_due_hosts():
+    """认领到期的主机并分片分发给 probe_hosts 子任务并发探测，返回认领的主机数
+
+    每次最多认领 PROBE_BATCH_SIZE 台（最早到期的优先），每 PROBE_SHARD_SIZE 台一个子任务。
+    认领时即把 next_probe_at 推迟 PROBE_CLAIM_TIMEOUT 秒：子任务排队和执行期间不会被重复认领，
+    子任务崩溃时这些主机在超时后重新到期。
+    """
+    now = timezone.now()
+    host_ids = list(
+        Host.objects.due_for_probe(now).values_list('id', flat=True)[:settings.PROBE_BATCH_SIZE]
+    )
+    claimed_until = now + timedelta(seconds=settings.PROBE_CLAIM_TIMEOUT)
+    shard_size = settings.PROBE_SHARD_SIZE
+    for start in range(0, len(host_ids), shard_size):
+        shard = host_ids[start:start + shard_size]
+        Host.objects.filter(pk__in=shard).update(next_probe_at=claimed_until)
+        _dispatch_probe(shard)
+    return len(host_ids)
+
+
+@shared_task
+@tracked_task
+def probe_hosts(host_ids):
+    """并发探测一组主机并批量写回结果（见 _probe_batch），返回探测的主机数"""
+    hosts = list(Host.objects.filter(pk__in=host_ids).exclude(status='maintenance').only(*PROBE_FIELDS))
+    _probe_batch(hosts)
+    return len(hosts)
+
+
+def _save_probe_results(hosts, original_status):
+    """批量写回探测结果（见 hosts.bulk.update_rows）
+
+    状态只在数据库中仍为探测前的状态时才覆盖，探测期间被人工修改（如改为维护中）的主机以数据库为准；
+    updated_at 只在状态确实改变时更新。
+    """
+    fields = [name for name in SCHEDULE_FIELDS if name not in ('status', 'updated_at')]
+    changed = [host for host in hosts if host.status != original_status[host.pk]]
+    unchanged = [host for host in hosts if host.status == original_status[host.pk]]
+    with transaction.atomic(using=router.db_for_write(Host)):
+        update_rows(Host, unchanged, fields)
+        guard = (['status', 'updated_at'], 'status', lambda host: original_status[host.pk])
+        update_rows(Host, changed, fields, guard=guard)
+
+
+@shared_task
+@tracked_task
+def run_bulk_job(job_id):
+    """后台执行批量操作任务，可安全重复执行（从上次中断处继续），返回本次处理的主机数"""
+    job = BulkJob.objects.get(pk=job_id)
+    if job.status == 'success':
+        return 0
+
+    job.status = 'running'
+    job.started_at = job.started_at or timezone.now()
+    job.error_message = ''
+    job.save(update_fields=['status', 'started_at', 'error_message'])
+
+    try:
+        processed = run_job(job)
+    except Exception as e:
+        job.status = 'failed'
+        job.error_message = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error_message', 'finished_at'])
+        raise
+
+    job.status = 'success'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at'])
+    return processed
+
+
+@shared_task
+@exclusive_task(lock_ttl=300)
+def expire_maintenance_windows():
+    """解除已到期的维护窗口：主机恢复为运行中并尽快重新探测，返回解除的主机数"""
+    now = timezone.now()
+    expired = Host.objects.filter(maintenance_until__lte=now)
+    count = expired.filter(status='maintenance').update(
+        status='active', maintenance_until=None, next_probe_at=now, updated_at=now,
+    )
+    # 维护状态已被手动解除的主机只清理截止时间
+    expired.update(maintenance_until=None)
+    return count
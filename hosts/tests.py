@@ -1,3 +1,967 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import importlib
+import io
+import json
+import os
+import re
+import tempfile
+import time
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, router
+from django.db.models import F
+from django.http import HttpResponse, QueryDict, StreamingHttpResponse
+from datetime import timedelta
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from host_management.routers import DatabaseRouter
+from .filters import filter_hosts, order_hosts
+from .bulk import target_hosts
+from .chunking import run_in_chunks
+from .locks import DatabaseLockBackend, LeaseLost, task_lock
+from .middleware import CompressionMiddleware
+from .models import (
+    BulkJob, City, CredentialAccessLog, DataCenter, Host, HostStatistics, PingSweep, RequestLog, TaskLock, TaskRun,
+)
+from .pagination import EstimatedCountPaginator
+from .renderers import FastJSONRenderer
+from .serializers import HostSerializer, HostStatisticsSerializer, RequestLogSerializer
+from .scheduling import record_probe
+from .task_runs import exclusive_task, save_checkpoint
+from .views import HostStatisticsViewSet, RequestLogViewSet
+from .tasks import (
+    _rotation_slot_start, _save_probe_results, change_host_passwords, expire_maintenance_windows,
+    generate_daily_statistics, ping_all_hosts, ping_sweep_shard, probe_due_hosts, probe_hosts, run_bulk_job, start_ping_sweep,
+)
 
-# Create your tests here.
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN 输出格式依赖 SQLite')
+class HostFilterIndexTests(TestCase):
+    """主机列表的每个过滤条件都应走索引查询"""
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name='北京', code='BJ')
+        datacenter = DataCenter.objects.create(name='北京机房A', code='BJ-A', city=city)
+        Host.objects.bulk_create([
+            Host(name=f'bj-a-{i:03d}', ip_address=f'10.0.0.{i + 1}', datacenter=datacenter,
+                 status='active' if i % 3 else 'inactive', encrypted_root_password='x')
+            for i in range(50)
+        ])
+        cls.datacenter = datacenter
+
+    def assertHostIndexSearch(self, query, index_name):
+        plan = filter_hosts(Host.objects.all(), QueryDict(query)).explain()
+        self.assertIn(f'SEARCH hosts_host USING INDEX {index_name}', plan)
+
+    def test_status(self):
+        self.assertHostIndexSearch('status=active', 'host_status_name_idx')
+
+    def test_datacenter(self):
+        self.assertHostIndexSearch(f'datacenter_id={self.datacenter.pk}', 'host_dc_')
+
+    def test_city(self):
+        plan = filter_hosts(Host.objects.all(), QueryDict(f'city_id={self.datacenter.city_id}')).explain()
+        self.assertIn('SEARCH hosts_host USING INDEX', plan)
+        self.assertNotIn('SCAN hosts_host', plan)
+
+    def test_name_prefix(self):
+        self.assertHostIndexSearch('name=bj-a-01', 'host_name_idx')
+
+    def test_status_and_name_prefix(self):
+        self.assertHostIndexSearch('status=active&name=bj-a', 'host_status_name_idx')
+
+    def test_password_older_than(self):
+        self.assertHostIndexSearch('password_older_than=30', 'host_pwd_change_idx')
+
+    def test_updated_since(self):
+        self.assertHostIndexSearch('updated_since=2025-01-01T00:00:00', 'host_updated_idx')
+
+    def test_name_prefix_matches(self):
+        hosts = filter_hosts(Host.objects.all(), QueryDict('name=bj-a-01'))
+        self.assertEqual(hosts.count(), 10)
+
+    def test_cidr(self):
+        self.assertHostIndexSearch('cidr=10.0.0.0/28', 'hosts_host_ip_key_')
+
+    def test_datacenter_and_cidr(self):
+        self.assertHostIndexSearch(f'datacenter_id={self.datacenter.pk}&cidr=10.0.0.0/28', 'host_dc_ip_key_idx')
+
+    def test_cidr_matches(self):
+        # 10.0.0.0/28 包含 10.0.0.1 - 10.0.0.15
+        self.assertEqual(filter_hosts(Host.objects.all(), QueryDict('cidr=10.0.0.0/28')).count(), 15)
+
+    def test_ordering_uses_index(self):
+        self.assertIn('USING INDEX host_name_idx', order_hosts(Host.objects.all(), 'name').explain())
+        self.assertIn('USING INDEX host_updated_idx', order_hosts(Host.objects.all(), 'updated_at').explain())
+
+    def assertInCidr(self, host, cidr):
+        self.assertEqual(list(Host.objects.in_cidr(cidr).values_list('pk', flat=True)), [host.pk])
+
+    def test_ip_key_synced_on_partial_save(self):
+        host = Host.objects.get(name='bj-a-000')
+        host.ip_address = '192.168.1.1'
+        host.save(update_fields=['ip_address'])
+        self.assertInCidr(host, '192.168.1.0/24')
+
+    def test_ip_key_synced_on_queryset_update(self):
+        host = Host.objects.get(name='bj-a-000')
+        Host.objects.filter(pk=host.pk).update(ip_address='192.168.2.1')
+        self.assertInCidr(host, '192.168.2.0/24')
+        with self.assertRaises(ValueError):
+            Host.objects.filter(pk=host.pk).update(ip_address=F('name'))
+
+    def test_ip_key_synced_on_bulk_update(self):
+        host = Host.objects.get(name='bj-a-000')
+        host.ip_address = '192.168.3.1'
+        Host.objects.bulk_update([host], ['ip_address'])
+        self.assertInCidr(host, '192.168.3.0/24')
+
+
+class HostListFilterApiTests(TestCase):
+    """主机列表接口的过滤与排序参数"""
+    # 请求日志可能被路由到独立的指标库
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name='上海', code='SH')
+        datacenter = DataCenter.objects.create(name='上海机房A', code='SH-A', city=city)
+        for i, status in enumerate(['active', 'inactive', 'maintenance']):
+            Host.objects.create(name=f'sh-{i}', ip_address=f'10.1.0.{i + 1}', datacenter=datacenter,
+                                status=status, encrypted_root_password='x')
+
+    def test_filter_and_ordering(self):
+        response = self.client.get('/api/hosts/', {'status': 'inactive'})
+        self.assertEqual([row['name'] for row in response.json()['results']], ['sh-1'])
+
+        response = self.client.get('/api/hosts/', {'ordering': '-name', 'fields': 'name'})
+        self.assertEqual(response.json()['results'], [{'name': 'sh-2'}, {'name': 'sh-1'}, {'name': 'sh-0'}])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/hosts/', {'ordering': 'encrypted_root_password'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/hosts/', {'updated_since': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/hosts/', {'cidr': '10.1.0.0/33'}).status_code, 400)
+        for days in ['1e9', 'nan', 'inf', '-1']:
+            response = self.client.get('/api/hosts/', {'password_older_than': days})
+            self.assertEqual(response.status_code, 400, days)
+            self.assertIn('password_older_than', response.json())
+
+    def test_name_prefix_is_literal(self):
+        datacenter = DataCenter.objects.get(code='SH-A')
+        Host.objects.create(name='sh_x', ip_address='10.1.0.20', datacenter=datacenter, encrypted_root_password='x')
+        Host.objects.create(name='SH-9', ip_address='10.1.0.21', datacenter=datacenter, encrypted_root_password='x')
+        response = self.client.get('/api/hosts/', {'name': 'sh_', 'fields': 'name'})
+        self.assertEqual(response.json()['results'], [{'name': 'sh_x'}])
+        response = self.client.get('/api/hosts/', {'name': 'sh-', 'fields': 'name'})
+        self.assertEqual(len(response.json()['results']), 3)
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN 输出格式依赖 SQLite')
+    def test_default_ordering_uses_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/hosts/')
+        self.assertEqual([row['name'] for row in response.json()['results']], ['sh-0', 'sh-1', 'sh-2'])
+
+        sql = next(query['sql'] for query in queries if 'LIMIT' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = '\n'.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('host_dc_name_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_ip_ordering_is_numeric(self):
+        datacenter = DataCenter.objects.get(code='SH-A')
+        Host.objects.create(name='sh-3', ip_address='10.1.0.10', datacenter=datacenter, encrypted_root_password='x')
+        response = self.client.get('/api/hosts/', {'ordering': 'ip_address', 'fields': 'ip_address'})
+        self.assertEqual([row['ip_address'] for row in response.json()['results']],
+                         ['10.1.0.1', '10.1.0.2', '10.1.0.3', '10.1.0.10'])
+
+    def test_subnets(self):
+        datacenter = DataCenter.objects.get(code='SH-A')
+        response = self.client.get(f'/api/datacenters/{datacenter.pk}/subnets/')
+        self.assertEqual(response.json()['subnets'], [
+            {'network': '10.1.0.0/24', 'hosts': 3, 'capacity': 254, 'utilization': 1.18},
+        ])
+
+
+def unreachable_probe(ip_address, timeout=5):
+    return {'ip_address': ip_address, 'is_reachable': ip_address.endswith('.1')}
+
+
+@override_settings(TASK_LOCK_BACKEND='db', HOST_PROBER=f'{__name__}.unreachable_probe', PROBE_JITTER=0)
+class ProbeScheduleTests(TestCase):
+    """自适应探测调度"""
+    # 任务锁和执行记录可能被路由到独立的指标库
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name='广州', code='GZ')
+        cls.datacenter = DataCenter.objects.create(name='广州机房A', code='GZ-A', city=city)
+        for i, status in enumerate(['active', 'active', 'maintenance']):
+            Host.objects.create(name=f'gz-{i}', ip_address=f'10.2.0.{i + 1}', datacenter=cls.datacenter,
+                                status=status, encrypted_root_password='x')
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN 输出格式依赖 SQLite')
+    def test_due_query_uses_index(self):
+        self.assertIn('USING INDEX host_probe_due_idx', Host.objects.due_for_probe().explain())
+
+    def test_backoff_and_flapping(self):
+        host = Host(status='active')
+        now = timezone.now()
+        intervals = []
+        for _ in range(8):
+            record_probe(host, True, now)
+            intervals.append((host.next_probe_at - now).total_seconds())
+        self.assertEqual(intervals, [120, 240, 480, 960, 1920, 3840, 7200, 7200])
+
+        self.assertTrue(record_probe(host, False, now))
+        self.assertEqual(host.status, 'inactive')
+        self.assertEqual(host.next_probe_at - now, timedelta(seconds=60))
+
+        # 反复翻转后即使探测成功也保持最短间隔
+        for reachable in [True, False, True, False, True]:
+            record_probe(host, reachable, now)
+        self.assertEqual(host.next_probe_at - now, timedelta(seconds=60))
+
+    def test_probe_due_hosts(self):
+        with patch('builtins.print'), patch('hosts.tasks._dispatch_probe', probe_hosts):
+            self.assertEqual(probe_due_hosts(), 2)
+            # 刚探测过的主机未到期
+            self.assertEqual(probe_due_hosts(), 0)
+
+        hosts = {host.name: host for host in Host.objects.all()}
+        self.assertEqual(hosts['gz-0'].status, 'active')
+        self.assertEqual(hosts['gz-1'].status, 'inactive')
+        self.assertEqual(hosts['gz-1'].probe_failures, 1)
+        self.assertEqual(hosts['gz-2'].status, 'maintenance')
+        self.assertIsNone(hosts['gz-2'].last_probe_at)
+
+    @override_settings(PROBE_SHARD_SIZE=1, PROBE_CLAIM_TIMEOUT=300)
+    def test_claim_and_fan_out(self):
+        now = timezone.now()
+        with patch('hosts.tasks._dispatch_probe') as dispatch:
+            self.assertEqual(probe_due_hosts(), 2)
+            # 子任务尚未执行，已认领的主机不会被再次分发
+            self.assertEqual(probe_due_hosts(), 0)
+        self.assertEqual(dispatch.call_count, 2)
+        for (host_ids,), _ in dispatch.call_args_list:
+            next_probe_at = Host.objects.get(pk=host_ids[0]).next_probe_at
+            self.assertAlmostEqual((next_probe_at - now).total_seconds(), 300, delta=5)
+
+    def test_unchanged_status_keeps_updated_at(self):
+        updated_at = timezone.now() - timedelta(days=1)
+        Host.objects.update(updated_at=updated_at)
+        with patch('builtins.print'):
+            probe_hosts(list(Host.objects.values_list('pk', flat=True)))
+
+        hosts = {host.name: host for host in Host.objects.all()}
+        self.assertEqual(hosts['gz-0'].updated_at, updated_at)
+        self.assertIsNotNone(hosts['gz-0'].last_probe_at)
+        self.assertGreater(hosts['gz-1'].updated_at, updated_at)
+
+    def test_outage_expedites_datacenter(self):
+        later = timezone.now() + timedelta(hours=2)
+        other = DataCenter.objects.create(name='广州机房B', code='GZ-B', city=self.datacenter.city)
+        Host.objects.create(name='gz-b-0', ip_address='10.2.1.2', datacenter=other,
+                            encrypted_root_password='x', next_probe_at=later)
+        Host.objects.exclude(name='gz-1').update(next_probe_at=later)
+
+        with patch('builtins.print'), patch('hosts.tasks._dispatch_probe', probe_hosts):
+            # 只有 gz-1 到期，探测发现其不可达后同机房的 gz-0 提前到期
+            self.assertEqual(probe_due_hosts(), 1)
+            self.assertEqual(list(Host.objects.due_for_probe().values_list('name', flat=True)), ['gz-0'])
+        self.assertEqual(Host.objects.get(name='gz-b-0').next_probe_at, later)
+        self.assertEqual(Host.objects.get(name='gz-2').next_probe_at, later)
+
+    def test_manual_status_change_is_kept(self):
+        host = Host.objects.get(name='gz-0')
+        record_probe(host, False, timezone.now())
+        # 探测期间主机被人工改为维护中
+        Host.objects.filter(pk=host.pk).update(status='maintenance')
+        _save_probe_results([host], {host.pk: 'active'})
+
+        host.refresh_from_db()
+        self.assertEqual(host.status, 'maintenance')
+        self.assertEqual(host.probe_failures, 1)
+
+
+@override_settings(TASK_LOCK_BACKEND='db')
+class BulkActionApiTests(TestCase):
+    """主机批量操作接口"""
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name='深圳', code='SZ')
+        cls.datacenter = DataCenter.objects.create(name='深圳机房A', code='SZ-A', city=city)
+        other = DataCenter.objects.create(name='深圳机房B', code='SZ-B', city=city)
+        for i in range(5):
+            Host.objects.create(name=f'sz-a-{i}', ip_address=f'10.3.0.{i + 1}', datacenter=cls.datacenter,
+                                encrypted_root_password='x')
+        Host.objects.create(name='sz-b-0', ip_address='10.3.1.1', datacenter=other, encrypted_root_password='x')
+
+    def post_bulk(self, data):
+        return self.client.post('/api/hosts/bulk/', data, content_type='application/json')
+
+    def test_maintenance_window(self):
+        response = self.post_bulk({'action': 'maintenance', 'target': {'datacenter_id': self.datacenter.pk},
+                                   'duration_minutes': 30})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['processed'], 5)
+        self.assertEqual(Host.objects.filter(status='maintenance', maintenance_until__isnull=False).count(), 5)
+
+        # 到期后自动恢复
+        Host.objects.update(maintenance_until=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(expire_maintenance_windows(), 5)
+        self.assertFalse(Host.objects.filter(status='maintenance').exists())
+        self.assertFalse(Host.objects.filter(maintenance_until__isnull=False).exists())
+
+    def test_set_status_by_cidr(self):
+        response = self.post_bulk({'action': 'set_status', 'target': {'cidr': '10.3.0.0/30'}, 'status': 'inactive'})
+        self.assertEqual(response.json()['processed'], 3)
+        self.assertEqual(set(Host.objects.filter(status='inactive').values_list('name', flat=True)),
+                         {'sz-a-0', 'sz-a-1', 'sz-a-2'})
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.post_bulk({'action': 'set_status', 'target': {}, 'status': 'active'}).status_code, 400)
+        self.assertEqual(self.post_bulk({'action': 'set_status', 'target': {'ids': [1]}}).status_code, 400)
+        self.assertEqual(self.post_bulk({'action': 'maintenance', 'target': {'ids': [1]}}).status_code, 400)
+        self.assertEqual(self.post_bulk({'action': 'set_status', 'target': {'cidr': 'x'}, 'status': 'active'}).status_code, 400)
+
+    def test_zero_id_targets_rejected(self):
+        # 值为 0 的条件不能被当作未指定而匹配全部主机
+        for target in [{'city_id': 0}, {'datacenter_id': 0}, {'ids': [0]}]:
+            response = self.post_bulk({'action': 'set_status', 'target': target, 'status': 'inactive'})
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Host.objects.filter(status='inactive').exists())
+        self.assertEqual(target_hosts({'city_id': 0}).count(), 0)
+
+    @override_settings(BULK_ROTATE_SYNC_LIMIT=1, BULK_CHUNK_SIZE=2)
+    def test_background_rotation(self):
+        with patch('hosts.views.run_bulk_job.delay') as delay:
+            response = self.post_bulk({'action': 'rotate_passwords', 'target': {'city_id': self.datacenter.city_id}})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        delay.assert_called_once_with(job_id)
+
+        self.assertEqual(run_bulk_job(job_id), 6)
+        job = BulkJob.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.processed, job.progress), ('success', 6, 100.0))
+        self.assertEqual(len({host.get_root_password() for host in Host.objects.all()}), 6)
+        self.assertEqual(self.client.get(f'/api/bulk-jobs/{job_id}/').json()['progress'], 100.0)
+
+
+class CredentialApiTests(TestCase):
+    """root密码批量读取接口"""
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name='杭州', code='HZ')
+        datacenter = DataCenter.objects.create(name='杭州机房A', code='HZ-A', city=city)
+        for i in range(3):
+            host = Host.objects.create(name=f'hz-{i}', ip_address=f'10.4.0.{i + 1}', datacenter=datacenter,
+                                       encrypted_root_password='x')
+            host.set_root_password(f'password-{i}')
+        cls.admin = User.objects.create_user('ops', password='x', is_staff=True)
+
+    def post_credentials(self, data):
+        return self.client.post('/api/hosts/credentials/', data, content_type='application/json')
+
+    def test_requires_admin(self):
+        self.assertIn(self.post_credentials({'cidr': '10.4.0.0/24'}).status_code, (401, 403))
+
+    def test_zero_id_target_rejected(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.post_credentials({'datacenter_id': 0}).status_code, 400)
+        with self.assertRaises(CommandError):
+            call_command('export_credentials', city=0, user='ops', stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse(CredentialAccessLog.objects.exists())
+
+    @override_settings(CREDENTIAL_CHUNK_SIZE=2)
+    def test_stream_and_audit(self):
+        self.client.force_login(self.admin)
+        response = self.post_credentials({'cidr': '10.4.0.0/30'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [
+            {'id': host.pk, 'ip_address': host.ip_address, 'root_password': f'password-{i}'}
+            for i, host in enumerate(Host.objects.order_by('pk')[:3])
+        ])
+        self.assertEqual(CredentialAccessLog.objects.filter(user='ops', source='api').count(), 3)
+
+    def test_decrypt_failures(self):
+        broken = Host.objects.order_by('pk').first()
+        Host.objects.filter(pk=broken.pk).update(encrypted_root_password='not-encrypted')
+        self.client.force_login(self.admin)
+        response = self.post_credentials({'cidr': '10.4.0.0/24'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertIsNone(rows[0]['root_password'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual((rows[-1]['error'], rows[-1]['failed'], rows[-1]['total']), ('decrypt_failed', 1, 3))
+        self.assertEqual(list(CredentialAccessLog.objects.filter(decrypt_failed=True).values_list('host_id', flat=True)),
+                         [broken.pk])
+
+        # 命令行导出同样追加错误汇总，并以非零状态退出
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'creds.ndjson')
+            with self.assertRaises(CommandError):
+                call_command('export_credentials', cidr='10.4.0.0/24', output=path, user='ops', stderr=io.StringIO())
+            with open(path) as f:
+                lines = f.read().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(json.loads(lines[-1])['failed'], 1)
+        self.assertEqual(CredentialAccessLog.objects.filter(source='command', decrypt_failed=True).count(), 1)
+
+
+class AdminChangelistTests(TestCase):
+    """管理后台大表列表页"""
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name='成都', code='CD')
+        datacenter = DataCenter.objects.create(name='成都机房A', code='CD-A', city=city)
+        for i in range(5):
+            Host.objects.create(name=f'cd-{i}', ip_address=f'10.5.0.{i + 1}', datacenter=datacenter,
+                                encrypted_root_password='x')
+        RequestLog.objects.bulk_create([
+            RequestLog(path='/api/hosts/', method='GET', response_time=1, status_code=200, ip_address='127.0.0.1')
+            for _ in range(5)
+        ])
+        cls.admin = User.objects.create_superuser('admin', password='x')
+
+    @override_settings(ADMIN_COUNT_CAP=3)
+    def test_capped_count(self):
+        self.assertEqual(EstimatedCountPaginator(Host.objects.all(), 2).count, 3)
+        self.assertEqual(EstimatedCountPaginator(Host.objects.filter(name='cd-0'), 2).count, 1)
+        self.assertEqual(EstimatedCountPaginator(list(range(5)), 2).count, 5)
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN 输出格式依赖 SQLite')
+    def test_request_log_indexes(self):
+        self.assertIn('USING INDEX requestlog_status_created_idx',
+                      RequestLog.objects.filter(status_code=500).order_by('-created_at').explain())
+
+    def test_changelists(self):
+        self.client.force_login(self.admin)
+        for url in ['/admin/hosts/host/', '/admin/hosts/requestlog/',
+                    '/admin/hosts/requestlog/?recent=24h&status_class=2&method=GET']:
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+
+        # 列表页的查询数不随主机数增长
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/admin/hosts/host/')
+        datacenter = DataCenter.objects.get(code='CD-A')
+        for i in range(5, 10):
+            Host.objects.create(name=f'cd-{i}', ip_address=f'10.5.0.{i + 1}', datacenter=datacenter,
+                                encrypted_root_password='x')
+        with CaptureQueriesContext(connection) as more_queries:
+            self.client.get('/admin/hosts/host/')
+        self.assertEqual(len(queries), len(more_queries))
+
+    def test_request_log_changelist_filters(self):
+        self.client.force_login(self.admin)
+        RequestLog.objects.create(path='/api/hosts/', method='POST', response_time=1, status_code=503,
+                                  ip_address='127.0.0.1')
+        # 过滤器选项固定，不对日志表做无范围的 SELECT DISTINCT
+        log_connection = connections[router.db_for_read(RequestLog)]
+        with CaptureQueriesContext(log_connection) as queries:
+            response = self.client.get('/admin/hosts/requestlog/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query['sql'] for query in queries if query['sql'].startswith('SELECT DISTINCT')])
+
+        response = self.client.get('/admin/hosts/requestlog/?status_class=5&method=POST&recent=1h')
+        self.assertEqual(response.context['cl'].result_count, 1)
+        response = self.client.get('/admin/hosts/requestlog/?status_class=4')
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+
+@override_settings(TASK_LOCK_BACKEND='db', TASK_CHUNK_SIZE=2)
+class ChunkedTaskTests(TestCase):
+    """全量任务分块处理与断点续跑"""
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name='武汉', code='WH')
+        cls.datacenters = [DataCenter.objects.create(name=f'武汉机房{i}', code=f'WH-{i}', city=city) for i in range(3)]
+        for i, status in enumerate(['active', 'inactive', 'active', 'maintenance', 'active']):
+            Host.objects.create(name=f'wh-{i}', ip_address=f'10.6.0.{i + 1}', datacenter=cls.datacenters[i % 2],
+                                status=status, encrypted_root_password='x')
+
+    def test_resume_after_crash(self):
+        from . import bulk
+        calls = []
+
+        def flaky_rotate(pks, now=None):
+            calls.append(list(pks))
+            if len(calls) == 2:
+                raise RuntimeError('worker crashed')
+            return rotate(pks, now)
+
+        rotate = bulk.rotate_passwords
+        with patch('builtins.print'), patch('hosts.tasks.rotate_passwords', flaky_rotate):
+            with self.assertRaises(RuntimeError):
+                change_host_passwords()
+            failed = TaskRun.objects.get(task_name='hosts.tasks.change_host_passwords', status='failed')
+            self.assertEqual(failed.checkpoint, calls[0][-1])
+
+            # 第二块失败回滚，重新执行时从第一块之后继续
+            self.assertEqual(change_host_passwords(), 3)
+        hosts = list(Host.objects.order_by('pk').values_list('pk', flat=True))
+        self.assertEqual(calls[2:], [hosts[2:4], hosts[4:]])
+
+    def test_resume_after_kill_with_lock_held(self):
+        # 上一次执行被 SIGKILL：执行记录停在执行中，锁没有释放
+        task_name = 'hosts.tasks.change_host_passwords'
+        hosts = list(Host.objects.order_by('pk').values_list('pk', flat=True))
+        killed = TaskRun.objects.create(task_name=task_name, started_at=_rotation_slot_start(timezone.now()),
+                                        checkpoint=hosts[1])
+        TaskLock.objects.create(name=task_name, token='killed', expires_at=timezone.now() + timedelta(minutes=5))
+
+        with patch('builtins.print'):
+            # 租约未到期时跳过
+            self.assertIsNone(change_host_passwords())
+            # 租约到期（远早于调度周期结束）后接管锁并从断点继续
+            TaskLock.objects.filter(name=task_name).update(expires_at=timezone.now())
+            with patch('hosts.tasks.rotate_passwords') as rotate:
+                self.assertEqual(change_host_passwords(), 3)
+        self.assertEqual([list(call.args[0]) for call in rotate.call_args_list], [hosts[2:4], hosts[4:]])
+        killed.refresh_from_db()
+        self.assertEqual(killed.status, 'failed')
+
+    def test_no_resume_across_rotation_slots(self):
+        # 上一个调度周期中断的执行不会被下一周期继续，所有主机都重新改密
+        task_name = 'hosts.tasks.change_host_passwords'
+        hosts = list(Host.objects.order_by('pk').values_list('pk', flat=True))
+        TaskRun.objects.create(task_name=task_name, checkpoint=hosts[1],
+                               started_at=_rotation_slot_start(timezone.now()) - timedelta(minutes=1))
+        with patch('builtins.print'), patch('hosts.tasks.rotate_passwords') as rotate:
+            self.assertEqual(change_host_passwords(), 5)
+        self.assertEqual([list(call.args[0]) for call in rotate.call_args_list], [hosts[:2], hosts[2:4], hosts[4:]])
+
+    def test_ping_all_hosts_guards_status(self):
+        # 10.6.0.1 可达、10.6.0.2 探测出错、其余不可达；wh-2 在探测期间被改为维护中
+        def probe(ip_address, timeout=5):
+            if ip_address == '10.6.0.3':
+                Host.objects.filter(ip_address=ip_address).update(status='maintenance')
+            return flaky_probe(ip_address, timeout)
+
+        class InlineExecutor:
+            # 在当前线程中探测，探测函数才能使用测试事务中的数据库连接
+            def __init__(self, max_workers):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            map = staticmethod(map)
+
+        Host.objects.filter(name='wh-1').update(status='active')
+        with patch('builtins.print'), patch('hosts.tasks.get_prober', return_value=probe), \
+                patch('hosts.tasks.ThreadPoolExecutor', InlineExecutor):
+            self.assertEqual(ping_all_hosts(), 5)
+        self.assertEqual(dict(Host.objects.values_list('name', 'status')), {
+            'wh-0': 'active', 'wh-1': 'active', 'wh-2': 'maintenance', 'wh-3': 'maintenance', 'wh-4': 'inactive',
+        })
+
+    def test_daily_statistics(self):
+        with patch('builtins.print'):
+            self.assertEqual(generate_daily_statistics(), 3)
+            # 当天重新执行覆盖已有记录
+            Host.objects.filter(name='wh-1').update(status='active')
+            with CaptureQueriesContext(connections[router.db_for_write(HostStatistics)]) as queries:
+                self.assertEqual(generate_daily_statistics(), 3)
+        # 每块（TASK_CHUNK_SIZE=2）一条 upsert，不逐个机房查询和写入
+        self.assertEqual(len([query for query in queries if 'INSERT INTO "hosts_hoststatistics"' in query['sql']]), 2)
+        self.assertEqual(HostStatistics.objects.count(), 3)
+        rows = {
+            stats.datacenter_id: (stats.total_hosts, stats.active_hosts, stats.inactive_hosts, stats.maintenance_hosts)
+            for stats in HostStatistics.objects.all()
+        }
+        self.assertEqual(rows, {
+            self.datacenters[0].pk: (3, 3, 0, 0),
+            self.datacenters[1].pk: (2, 1, 0, 1),
+            self.datacenters[2].pk: (0, 0, 0, 0),
+        })
+
+
+def flaky_probe(ip_address, timeout=5):
+    if ip_address.endswith('.2'):
+        raise OSError('ping: socket error')
+    return unreachable_probe(ip_address, timeout)
+
+
+@override_settings(HOST_PROBER=f'{__name__}.flaky_probe')
+class PingSweepTests(TestCase):
+    """分片ping巡检"""
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name='南京', code='NJ')
+        datacenter = DataCenter.objects.create(name='南京机房A', code='NJ-A', city=city)
+        for i, status in enumerate(['inactive', 'active', 'active']):
+            Host.objects.create(name=f'nj-{i}', ip_address=f'10.7.0.{i + 1}', datacenter=datacenter,
+                                status=status, encrypted_root_password='x')
+
+    def test_sweep(self):
+        with patch('builtins.print'), patch('hosts.tasks._dispatch_shard', lambda shard: ping_sweep_shard(shard.pk)):
+            sweep = PingSweep.objects.get(pk=start_ping_sweep())
+
+        self.assertEqual(sweep.status, 'success')
+        self.assertEqual((sweep.total_hosts, sweep.reachable_hosts, sweep.unreachable_hosts, sweep.changed_hosts),
+                         (3, 1, 1, 2))
+        # 探测出错的主机保持原状态
+        self.assertEqual(dict(Host.objects.values_list('name', 'status')),
+                         {'nj-0': 'active', 'nj-1': 'active', 'nj-2': 'inactive'})
+
+    @override_settings(PING_SWEEP_HASH_SHARDS=1, PING_SWEEP_SHARD_SIZE=2, TASK_CHUNK_SIZE=2)
+    def test_hash_sweep_scales_and_batches(self):
+        with CaptureQueriesContext(connection) as queries, patch('builtins.print'), \
+                patch('hosts.tasks._dispatch_shard', lambda shard: ping_sweep_shard(shard.pk)):
+            sweep = PingSweep.objects.get(pk=start_ping_sweep('hash'))
+
+        # 分片数随主机数增长；探测只加载需要的列，写回不逐台执行
+        self.assertEqual((sweep.shard_count, sweep.status, sweep.total_hosts), (2, 'success', 3))
+        host_queries = [query['sql'] for query in queries if 'hosts_host' in query['sql']]
+        self.assertFalse(any('encrypted_root_password' in sql for sql in host_queries))
+        self.assertLessEqual(sum(sql.startswith('UPDATE "hosts_host"') for sql in host_queries), 4)
+        self.assertEqual(set(Host.objects.values_list('encrypted_root_password', flat=True)), {'x'})
+
+
+@exclusive_task(lock_ttl=60)
+def exclusive_job(nested=False):
+    if nested:
+        assert exclusive_job() is None
+    save_checkpoint(10)
+    return 3
+
+
+@exclusive_task(lock_ttl=60, overlap='coalesce')
+def coalesced_job(overlaps=0):
+    for _ in range(overlaps):
+        coalesced_job()
+    return overlaps
+
+
+@exclusive_task(lock_ttl=60)
+def stolen_lock_job(handled):
+    def handle(hosts):
+        handled.append([host.pk for host in hosts])
+        # 处理第一块期间租约过期，锁被另一个实例获取
+        TaskLock.objects.filter(name=f'{__name__}.stolen_lock_job').update(token='other')
+        return len(hosts)
+    return run_in_chunks(Host.objects.all(), handle, fields=['name'], chunk_size=1)
+
+
+@override_settings(TASK_LOCK_BACKEND='db')
+class TaskLockTests(TestCase):
+    """定时任务互斥锁与执行记录"""
+    databases = '__all__'
+    task_name = f'{__name__}.exclusive_job'
+
+    def test_expired_lock_takeover(self):
+        backend = DatabaseLockBackend()
+        self.assertTrue(backend.acquire('job', 'a', 60))
+        self.assertFalse(backend.acquire('job', 'b', 60))
+
+        # 持有者崩溃，锁过期后被接管；原持有者不能再释放或续期
+        TaskLock.objects.filter(name='job').update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(backend.acquire('job', 'b', 60))
+        backend.release('job', 'a')
+        self.assertFalse(backend.renew('job', 'a', 60))
+        self.assertFalse(backend.acquire('job', 'c', 60))
+
+        self.assertTrue(backend.renew('job', 'b', 600))
+        self.assertGreater(TaskLock.objects.get(name='job').expires_at, timezone.now() + timedelta(seconds=500))
+
+    def test_skip_overlapping_run(self):
+        with patch('builtins.print'):
+            self.assertEqual(exclusive_job(nested=True), 3)
+        runs = dict(TaskRun.objects.filter(task_name=self.task_name).values_list('status', 'item_count'))
+        self.assertEqual(runs, {'success': 3, 'skipped': None})
+
+    def test_checkpoint_renews_lease(self):
+        renew = DatabaseLockBackend.renew
+        with patch.object(DatabaseLockBackend, 'renew', autospec=True, side_effect=renew) as mock:
+            self.assertEqual(exclusive_job(), 3)
+        mock.assert_called_once()
+        _, name, _, ttl = mock.call_args.args
+        self.assertEqual((name, ttl), (self.task_name, 60))
+
+    def test_stop_after_lease_lost(self):
+        city = City.objects.create(name='长沙', code='CS')
+        datacenter = DataCenter.objects.create(name='长沙机房A', code='CS-A', city=city)
+        for i in range(3):
+            Host.objects.create(name=f'cs-{i}', ip_address=f'10.10.0.{i + 1}', datacenter=datacenter,
+                                encrypted_root_password='x')
+
+        handled = []
+        with self.assertRaises(LeaseLost):
+            stolen_lock_job(handled)
+        self.assertEqual(len(handled), 1)
+        run = TaskRun.objects.get(task_name=f'{__name__}.stolen_lock_job')
+        self.assertEqual((run.status, run.checkpoint), ('failed', handled[0][0]))
+        self.assertIn('锁已过期', run.error_message)
+        # 不释放其他实例持有的锁
+        self.assertEqual(TaskLock.objects.get(name=run.task_name).token, 'other')
+
+    def test_coalesce(self):
+        backend = DatabaseLockBackend()
+        with patch('builtins.print'), patch('hosts.task_runs.current_app.send_task') as send_task:
+            self.assertEqual(coalesced_job(), 0)
+            send_task.assert_not_called()
+
+            # 执行期间的多次调度合并为一次补跑
+            self.assertEqual(coalesced_job(overlaps=2), 2)
+            send_task.assert_called_once_with(f'{__name__}.coalesced_job', args=(), kwargs={'overlaps': 2})
+        self.assertFalse(backend.pop_pending(f'{__name__}.coalesced_job'))
+
+        with task_lock('job', 60, backend) as lease:
+            self.assertTrue(lease)
+            backend.mark_pending('job')
+            backend.mark_pending('job')
+        self.assertTrue(backend.pop_pending('job'))
+        self.assertFalse(backend.pop_pending('job'))
+
+    def test_run_lag_and_duration(self):
+        request = Mock(id='task-1', published_at=time.time() - 5)
+        with patch('hosts.task_runs.current_task', Mock(request=request)):
+            exclusive_job()
+        run = TaskRun.objects.get(task_name=self.task_name)
+        self.assertEqual((run.task_id, run.status, run.item_count, run.checkpoint), ('task-1', 'success', 3, 10))
+        self.assertAlmostEqual(run.lag, 5, delta=1)
+        self.assertGreaterEqual(run.duration, 0)
+        self.assertGreaterEqual(run.finished_at, run.started_at)
+        self.assertEqual(run.throughput, 3 / run.duration if run.duration else None)
+
+
+class RequestTimeMiddlewareTests(TestCase):
+    """请求耗时与SQL统计中间件"""
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name='西安', code='XA')
+        datacenter = DataCenter.objects.create(name='西安机房A', code='XA-A', city=city)
+        Host.objects.create(name='xa-0', ip_address='10.8.0.1', datacenter=datacenter, encrypted_root_password='x')
+
+    def test_server_timing_and_request_log(self):
+        response = self.client.get('/api/hosts/', HTTP_USER_AGENT='tests')
+        match = re.fullmatch(r'total;dur=(\d+\.\d), db;dur=(\d+\.\d);desc="(\d+) queries"', response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        total, sql_time, count = float(match[1]), float(match[2]), int(match[3])
+        self.assertGreater(count, 0)
+        self.assertLessEqual(sql_time, total)
+
+        log = RequestLog.objects.get()
+        self.assertEqual((log.path, log.method, log.status_code, log.user_agent), ('/api/hosts/', 'GET', 200, 'tests'))
+        self.assertEqual(log.query_count, count)
+        self.assertAlmostEqual(log.sql_time, sql_time, delta=0.1)
+        self.assertIn('SELECT', log.slowest_query)
+        self.assertFalse(log.over_query_budget)
+
+    @override_settings(REQUEST_QUERY_BUDGET=0)
+    def test_over_query_budget(self):
+        with self.assertLogs('hosts.middleware', 'WARNING') as logs:
+            self.client.get('/api/hosts/')
+        self.assertIn('/api/hosts/', logs.output[0])
+        self.assertTrue(RequestLog.objects.get().over_query_budget)
+
+
+class FakeBrotli:
+    """测试环境未必安装 brotli，用 zlib 代替并加上标记"""
+
+    @staticmethod
+    def compress(data, quality):
+        return b'br:' + gzip.zlib.compress(data)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionTests(SimpleTestCase):
+    """响应压缩与JSON渲染"""
+    body = b'{"name": "host"}' * 100
+
+    def compress(self, body=None, accept_encoding='gzip, br', response=None):
+        middleware = CompressionMiddleware(lambda request: response or HttpResponse(body or self.body))
+        return middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_gzip(self):
+        response = self.compress()
+        self.assertEqual((response['Content-Encoding'], response['Vary']), ('gzip', 'Accept-Encoding'))
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        # BREACH 防护：相同内容每次压缩结果不同
+        self.assertNotEqual(self.compress().content, response.content)
+
+    def test_negotiation(self):
+        response = self.compress(accept_encoding='')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+        with patch('hosts.middleware.brotli', FakeBrotli):
+            self.assertEqual(self.compress()['Content-Encoding'], 'br')
+            self.assertEqual(self.compress(accept_encoding='gzip, br;q=0')['Content-Encoding'], 'gzip')
+            self.assertEqual(self.compress(accept_encoding='gzip')['Content-Encoding'], 'gzip')
+
+    def test_size_threshold(self):
+        self.assertFalse(self.compress(self.body[:1023]).has_header('Content-Encoding'))
+        self.assertEqual(self.compress(self.body[:1024])['Content-Encoding'], 'gzip')
+
+        # 压缩后不变小的响应原样返回
+        body = os.urandom(2048)
+        self.assertEqual(self.compress(body, 'gzip').content, body)
+        with patch('hosts.middleware.brotli', FakeBrotli):
+            response = self.compress(body, 'br')
+        self.assertEqual((response.content, response.has_header('Content-Encoding')), (body, False))
+
+    def test_streaming(self):
+        chunks = [self.body[:10], self.body[10:]]
+        response = self.compress(response=StreamingHttpResponse(iter(chunks)))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.body)
+
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+
+        async def consume(content):
+            return [chunk async for chunk in content]
+
+        with patch('hosts.middleware.brotli', FakeBrotli):
+            response = self.compress(response=StreamingHttpResponse(stream()))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        parts = asyncio.run(consume(response.streaming_content))
+        self.assertEqual(b''.join(gzip.decompress(part) for part in parts), self.body)
+
+    def test_renderer_parity(self):
+        now = timezone.now()
+        data = {
+            'count': 2, 'next': None, 'results': [
+                {'id': 1, 'name': '主机\u2028一', 'created_at': now, 'date': now.date(), 'ratio': 0.1,
+                 'tags': ['a', 'b'], 'nested': {'ok': True}},
+                {'id': 2, 'name': 'host "2"', 'created_at': now.replace(microsecond=0), 'ratio': 12.5},
+            ],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+        # 科学计数法的浮点数写法不同（1e-05 / 1e-5），解析结果相同
+        data = {'sql_time': 1e-05, 'response_time': 1e20}
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+
+class FastListApiTests(TestCase):
+    """列表接口快速读路径与序列化器输出一致"""
+    databases = '__all__'
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name='成都', code='CD')
+        datacenters = [DataCenter.objects.create(name=f'成都机房{i}', code=f'CD-{i}', city=city) for i in range(2)]
+        now = timezone.now()
+        for i in range(6):
+            host = Host.objects.create(name=f'cd-{i}', ip_address=f'10.9.0.{i + 1}', datacenter=datacenters[i % 2],
+                                       status=['active', 'inactive', 'maintenance'][i % 3], encrypted_root_password='x',
+                                       maintenance_until=now + timedelta(hours=i) if i % 3 == 2 else None)
+            host.set_root_password(f'password-{i}')
+        for days in range(3):
+            for datacenter in datacenters:
+                HostStatistics.objects.create(city=city, datacenter=datacenter, total_hosts=3,
+                                              date=now.date() - timedelta(days=days))
+        for i in range(5):
+            RequestLog.objects.create(path=f'/api/hosts/{i}/', method='GET', response_time=1.5 * i, status_code=200,
+                                      ip_address='127.0.0.1', sql_time=0.25, slowest_query='SELECT 1')
+
+    def assertMatchesSerializer(self, url, serializer_class, queryset):
+        response = self.client.get(url, {'page_size': 4})
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()['results']
+        self.assertEqual(len(rows), 4)
+
+        expected = {row['id']: row for row in serializer_class(queryset, many=True).data}
+        for row in rows:
+            self.assertEqual(list(row), list(expected[row['id']]))
+            self.assertEqual(row, expected[row['id']])
+        return rows
+
+    def test_matches_serializer(self):
+        rows = self.assertMatchesSerializer('/api/hosts/', HostSerializer, Host.objects.all())
+        self.assertTrue(all(row['city_name'] == '成都' and row['last_password_change'] for row in rows))
+        self.assertMatchesSerializer('/api/statistics/', HostStatisticsSerializer, HostStatistics.objects.all())
+        # 请求日志在响应生成后才写入，先取出已有记录作为对照
+        self.assertMatchesSerializer('/api/logs/', RequestLogSerializer, list(RequestLog.objects.all()))
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/hosts/', {'fields': 'id,ip_address,city_name'})
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'ip_address', 'city_name'})
+        select = next(query['sql'] for query in queries if 'LIMIT' in query['sql']).split(' FROM ')[0]
+        self.assertIn('ip_address', select)
+        self.assertNotIn('encrypted_root_password', select)
+        self.assertNotIn('"hosts_host"."name"', select)
+
+        response = self.client.get('/api/hosts/', {'fields': 'id,root_password,nope'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('nope', response.json()['fields'])
+
+
+class DatabaseRouterTests(SimpleTestCase):
+    """指标库与只读副本路由"""
+    router = DatabaseRouter()
+
+    def configured(self, *aliases):
+        """只保留 default 和指定别名的 DATABASES（只用于路由判断，不建立连接）"""
+        databases = {'default': settings.DATABASES['default']}
+        databases.update({alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'} for alias in aliases})
+        return patch.dict(settings.DATABASES, databases, clear=True)
+
+    def test_allow_migrate_without_metrics(self):
+        with self.configured():
+            self.assertIsNone(self.router.allow_migrate('default', 'hosts', model_name='requestlog'))
+            self.assertIsNone(self.router.allow_migrate('default', 'hosts', model_name='host'))
+
+    def test_allow_migrate_with_metrics(self):
+        with self.configured('metrics'):
+            self.assertTrue(self.router.allow_migrate('metrics', 'hosts', model_name='requestlog'))
+            self.assertFalse(self.router.allow_migrate('metrics', 'hosts', model_name='host'))
+            self.assertFalse(self.router.allow_migrate('default', 'hosts', model_name='taskrun'))
+            self.assertIsNone(self.router.allow_migrate('default', 'hosts', model_name='host'))
+
+    def test_run_python_hint(self):
+        # 0008 的数据迁移只能在主机表所在的库执行
+        migration = importlib.import_module('hosts.migrations.0008_host_ip_key').Migration
+        hints = next(op.hints for op in migration.operations if hasattr(op, 'code'))
+        with self.configured('metrics'):
+            self.assertFalse(self.router.allow_migrate('metrics', 'hosts', **hints))
+            self.assertIsNone(self.router.allow_migrate('default', 'hosts', **hints))
+
+    def test_replica_never_migrates(self):
+        with self.configured('replica'):
+            self.assertFalse(self.router.allow_migrate('replica', 'hosts', model_name='host'))
+
+    def read_alias(self, viewset_class):
+        view = viewset_class()
+        view.request = Request(RequestFactory().get('/'))
+        view.action = 'list'
+        view.format_kwarg = None
+        return view.get_queryset().db
+
+    def test_replica_read_mixin(self):
+        with self.configured('replica'):
+            self.assertEqual(self.read_alias(HostStatisticsViewSet), 'replica')
+            self.assertEqual(self.read_alias(RequestLogViewSet), 'default')
+        with self.configured('metrics'):
+            self.assertEqual(self.read_alias(HostStatisticsViewSet), 'default')
+            self.assertEqual(self.read_alias(RequestLogViewSet), 'metrics')
+        with self.configured():
+            self.assertEqual(self.read_alias(HostStatisticsViewSet), 'default')
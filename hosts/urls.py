@@ -2,7 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     CityViewSet, DataCenterViewSet, HostViewSet,
-    HostStatisticsViewSet, RequestLogViewSet
+    HostStatisticsViewSet, RequestLogViewSet, PingSweepViewSet,
+    TaskRunViewSet, BulkJobViewSet
 )
 
 router = DefaultRouter()
@@ -11,6 +12,9 @@ router.register(r'datacenters', DataCenterViewSet)
 router.register(r'hosts', HostViewSet)
 router.register(r'statistics', HostStatisticsViewSet)
 router.register(r'logs', RequestLogViewSet)
+router.register(r'ping-sweeps', PingSweepViewSet)
+router.register(r'task-runs', TaskRunViewSet)
+router.register(r'bulk-jobs', BulkJobViewSet)
 
 urlpatterns = [
     path('api/', include(router.urls)),
@@ -1,14 +1,59 @@
 import subprocess
-import platform
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
+from collections import Counter
+from datetime import timedelta
+from itertools import chain
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Q, Sum
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from .models import City, DataCenter, Host, HostStatistics, RequestLog
+from django.utils import timezone
+from host_management.routers import read_alias_for
+from .bulk import create_job, target_hosts
+from .credentials import CredentialAuditor, failure_record, iter_credentials
+from .filters import filter_hosts, order_hosts
+from .middleware import get_client_ip
+from .models import BulkJob, City, DataCenter, Host, HostStatistics, RequestLog, PingSweep, TaskRun
+from .network import cidr_to_key_range, key_network, network_capacity
+from .ping import get_prober
+from .renderers import ndjson_line
 from .serializers import (
     CitySerializer, DataCenterSerializer, HostSerializer,
-    HostStatisticsSerializer, RequestLogSerializer, PingResponseSerializer
+    HostStatisticsSerializer, RequestLogSerializer, PingResponseSerializer,
+    PingSweepSerializer, TaskRunSerializer, BulkActionSerializer, BulkJobSerializer, BulkTargetSerializer,
+    get_row_builder
 )
+from .tasks import start_ping_sweep, retry_ping_sweep, run_bulk_job
+
+
+class ReplicaReadMixin:
+    """只读视图集的查询走只读副本（或指标库），减轻主库压力"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return queryset.using(read_alias_for(queryset.model))
+
+
+class FastListMixin:
+    """列表接口的快速读路径
+
+    直接从 .values() 构造与序列化器一致的输出行，跳过逐对象的序列化；
+    支持 ?fields=id,ip_address,status 稀疏字段集，只查询和输出指定的列。
+    """
+
+    def list(self, request, *args, **kwargs):
+        builder = get_row_builder(self.get_serializer_class())
+        fields = request.query_params.get('fields')
+        columns = builder.select([f.strip() for f in fields.split(',') if f.strip()] if fields else None)
+
+        queryset = self.filter_queryset(self.get_queryset()).values(*builder.lookups(columns))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(builder.build(page, columns))
+        return Response(builder.build(queryset, columns))
 
 
 class CityViewSet(viewsets.ModelViewSet):
@@ -22,59 +67,108 @@ class DataCenterViewSet(viewsets.ModelViewSet):
     queryset = DataCenter.objects.all()
     serializer_class = DataCenterSerializer
 
+    @action(detail=True, methods=['get'])
+    def subnets(self, request, pk=None):
+        """机房各网段的主机数与地址利用率
+
+        IPv4 按 prefix（默认24）、IPv6 按 prefix6（默认64）划分网段。
+        """
+        datacenter = self.get_object()
+        try:
+            prefix_v4 = int(request.query_params.get('prefix', 24))
+            prefix_v6 = int(request.query_params.get('prefix6', 64))
+        except ValueError:
+            return Response({'error': 'prefix 和 prefix6 必须为整数'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 <= prefix_v4 <= 32 or not 0 <= prefix_v6 <= 128:
+            return Response({'error': 'prefix 取值 0-32，prefix6 取值 0-128'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 只读取 ip_key 一列，按 (datacenter, ip_key) 索引顺序遍历
+        keys = (
+            Host.objects.filter(datacenter=datacenter)
+            .exclude(ip_key='')
+            .order_by('ip_key')
+            .values_list('ip_key', flat=True)
+        )
+        counts = Counter(key_network(key, prefix_v4, prefix_v6) for key in keys.iterator(chunk_size=2000))
+
+        subnets = []
+        for network, hosts in counts.items():
+            capacity = network_capacity(network)
+            subnets.append({
+                'network': str(network),
+                'hosts': hosts,
+                'capacity': capacity,
+                'utilization': round(hosts / capacity * 100, 2) if capacity else None,
+            })
+        return Response({
+            'datacenter_id': datacenter.id,
+            'datacenter_name': datacenter.name,
+            'subnets': subnets,
+        })
 
-class HostViewSet(viewsets.ModelViewSet):
+
+class HostViewSet(FastListMixin, viewsets.ModelViewSet):
     """主机视图集"""
     queryset = Host.objects.all()
     serializer_class = HostSerializer
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # 支持按状态、机房、城市、名称前缀、密码未修改天数、更新时间过滤，以及白名单字段排序
+        if self.action == 'list':
+            queryset = filter_hosts(queryset, self.request.query_params)
+            queryset = order_hosts(queryset, self.request.query_params.get('ordering'))
+        return queryset
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """批量修改状态、设置维护窗口或轮换密码
+
+        目标主机较少时直接执行完成并返回200，否则转为后台分块执行并返回202，
+        通过 /api/bulk-jobs/{id}/ 查询进度。
+        """
+        serializer = BulkActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = create_job(**serializer.validated_data)
+        if job.status == 'pending':
+            run_bulk_job.delay(job.pk)
+            return Response(BulkJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        return Response(BulkJobSerializer(job).data)
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def credentials(self, request):
+        """批量读取root密码（仅管理员），请求体为目标主机条件（同批量操作的 target）
+
+        以 NDJSON 流式返回，每行 {"id", "ip_address", "root_password"}，访问记录写入审计日志；
+        有主机无法解密时，末尾追加一行 {"error": "decrypt_failed", "failed", "total", "message"}。
+        """
+        target = BulkTargetSerializer(data=request.data)
+        target.is_valid(raise_exception=True)
+        auditor = CredentialAuditor(request.user.get_username(), 'api', get_client_ip(request))
+        chunks = iter_credentials(
+            target_hosts(target.validated_data), auditor, workers=settings.CREDENTIAL_DECRYPT_WORKERS
+        )
+
+        def lines():
+            for credential in chain.from_iterable(chunks):
+                yield ndjson_line(credential)
+            # 流式响应的状态码已经发出，解密失败只能在末尾追加一行错误汇总
+            failure = failure_record(auditor)
+            if failure is not None:
+                yield ndjson_line(failure)
+
+        response = StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+        response['Cache-Control'] = 'no-store'
+        return response
+    
     @action(detail=True, methods=['post'])
     def ping(self, request, pk=None):
         """探测主机是否可达"""
         host = self.get_object()
         
         try:
-            # 根据操作系统选择ping命令
-            if platform.system().lower() == "windows":
-                ping_cmd = ["ping", "-n", "1", "-w", "1000", host.ip_address]
-            else:
-                ping_cmd = ["ping", "-c", "1", "-W", "1", host.ip_address]
-            
-            # 执行ping命令
-            result = subprocess.run(
-                ping_cmd,
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            is_reachable = result.returncode == 0
-            response_data = {
-                'ip_address': host.ip_address,
-                'is_reachable': is_reachable,
-            }
-            
-            if is_reachable:
-                # 提取响应时间（如果可能）
-                try:
-                    if platform.system().lower() == "windows":
-                        # Windows ping输出解析
-                        for line in result.stdout.split('\n'):
-                            if '时间=' in line or 'time=' in line:
-                                time_str = line.split('时间=')[-1].split('ms')[0] if '时间=' in line else line.split('time=')[-1].split('ms')[0]
-                                response_data['response_time'] = float(time_str)
-                                break
-                    else:
-                        # Linux/Unix ping输出解析
-                        for line in result.stdout.split('\n'):
-                            if 'time=' in line:
-                                time_str = line.split('time=')[-1].split(' ')[0]
-                                response_data['response_time'] = float(time_str)
-                                break
-                except:
-                    pass
-            else:
-                response_data['error_message'] = result.stderr or '主机不可达'
+            response_data = get_prober()(host.ip_address)
             
             serializer = PingResponseSerializer(data=response_data)
             serializer.is_valid(raise_exception=True)
@@ -94,13 +188,13 @@ class HostViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class HostStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
+class HostStatisticsViewSet(FastListMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """主机统计视图集（只读）"""
     queryset = HostStatistics.objects.all()
     serializer_class = HostStatisticsSerializer
     
     def get_queryset(self):
-        queryset = HostStatistics.objects.all()
+        queryset = super().get_queryset()
         
         # 支持按城市和机房过滤
         city_id = self.request.query_params.get('city_id', None)
@@ -117,18 +211,19 @@ class HostStatisticsViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
-class RequestLogViewSet(viewsets.ReadOnlyModelViewSet):
+class RequestLogViewSet(FastListMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """请求日志视图集（只读）"""
     queryset = RequestLog.objects.all()
     serializer_class = RequestLogSerializer
     
     def get_queryset(self):
-        queryset = RequestLog.objects.all()
+        queryset = super().get_queryset()
         
-        # 支持按路径、方法、状态码过滤
+        # 支持按路径、方法、状态码、是否超出SQL预算过滤
         path = self.request.query_params.get('path', None)
         method = self.request.query_params.get('method', None)
         status_code = self.request.query_params.get('status_code', None)
+        over_query_budget = self.request.query_params.get('over_query_budget', None)
         
         if path:
             queryset = queryset.filter(path__icontains=path)
@@ -136,5 +231,105 @@ class RequestLogViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(method=method.upper())
         if status_code:
             queryset = queryset.filter(status_code=status_code)
+        if over_query_budget:
+            queryset = queryset.filter(over_query_budget=over_query_budget.lower() in ('1', 'true'))
+            
+        return queryset
+
+
+class PingSweepViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    """分片ping巡检视图集：查看进度、发起巡检、重试失败分片"""
+    queryset = PingSweep.objects.prefetch_related('shards')
+    serializer_class = PingSweepSerializer
+    
+    @action(detail=False, methods=['post'])
+    def start(self, request):
+        """发起一次分片巡检，可选参数 strategy: datacenter/hash，cidr: 只巡检该网段"""
+        strategy = request.data.get('strategy')
+        if strategy and strategy not in dict(PingSweep.STRATEGY_CHOICES):
+            return Response({'strategy': '不支持的分片策略'}, status=status.HTTP_400_BAD_REQUEST)
+        cidr = request.data.get('cidr')
+        if cidr:
+            try:
+                cidr_to_key_range(cidr)
+            except ValueError:
+                return Response({'cidr': '网段格式错误，应为CIDR格式，如 10.0.0.0/16'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = start_ping_sweep.delay(strategy, cidr)
+        return Response({'task_id': result.id}, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        """重试失败分片，可选参数 shard_ids 指定分片"""
+        sweep = self.get_object()
+        result = retry_ping_sweep.delay(sweep.pk, request.data.get('shard_ids'))
+        return Response({'task_id': result.id}, status=status.HTTP_202_ACCEPTED)
+
+
+class BulkJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """批量操作任务视图集（只读），进度需要实时，直接读主库"""
+    queryset = BulkJob.objects.all()
+    serializer_class = BulkJobSerializer
+
+
+class TaskRunViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    """任务执行记录视图集（只读）"""
+    queryset = TaskRun.objects.all()
+    serializer_class = TaskRunSerializer
+    
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """按任务汇总最近 hours 小时（默认24）的执行指标"""
+        try:
+            hours = float(request.query_params.get('hours', 24))
+        except ValueError:
+            return Response({'hours': '必须为数字'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        since = timezone.now() - timedelta(hours=hours)
+        rows = (
+            self.get_queryset()
+            .filter(started_at__gte=since)
+            .exclude(status='skipped')
+            .values('task_name')
+            .annotate(
+                runs=Count('id'),
+                failed=Count('id', filter=Q(status='failed')),
+                avg_duration=Avg('duration'),
+                max_duration=Max('duration'),
+                avg_cpu_time=Avg('cpu_time'),
+                avg_query_count=Avg('query_count'),
+                avg_query_time=Avg('query_time'),
+                avg_lag=Avg('lag'),
+                total_items=Sum('item_count'),
+                total_duration=Sum('duration'),
+            )
+            .order_by('task_name')
+        )
+        skipped = dict(
+            self.get_queryset()
+            .filter(started_at__gte=since, status='skipped')
+            .values_list('task_name')
+            .annotate(Count('id'))
+        )
+        
+        data = []
+        for row in rows:
+            total_duration = row.pop('total_duration')
+            row['skipped'] = skipped.get(row['task_name'], 0)
+            row['throughput'] = row['total_items'] / total_duration if row['total_items'] and total_duration else None
+            data.append(row)
+        return Response(data)
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        # 支持按任务名称和状态过滤
+        task_name = self.request.query_params.get('task_name', None)
+        run_status = self.request.query_params.get('status', None)
+        
+        if task_name:
+            queryset = queryset.filter(task_name=task_name)
+        if run_status:
+            queryset = queryset.filter(status=run_status)
             
         return queryset